@@ -0,0 +1,44 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Cold-start import budget for the simulation core. Batch workers start
+# many short-lived processes, so this is paid on every run.
+CORE = ("world", "body", "collision", "constraints")
+BUDGET_MS = 50.0
+# Heavy optional dependencies the core must not pull in at import time
+FORBIDDEN = ("pygame", "numpy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = f"""
+import json, sys, time
+sys.path.insert(0, {ROOT!r})
+t = time.perf_counter()
+import {", ".join(CORE)}
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({{"ms": ms, "loaded": [m for m in {FORBIDDEN!r} if m in sys.modules]}}))
+"""
+
+
+def measure(runs=7):
+    # Each run is a fresh interpreter; -B keeps it from writing .pyc files,
+    # but cached bytecode from earlier imports is still used
+    samples, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-B", "-c", PROBE],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        samples.append(result["ms"])
+        loaded.update(result["loaded"])
+    return statistics.median(samples), sorted(loaded)
+
+
+if __name__ == "__main__":
+    ms, loaded = measure()
+    print(f"core import: {ms:.1f} ms (budget {BUDGET_MS:.0f} ms)")
+    if loaded:
+        print("core imports optional dependencies:", ", ".join(loaded))
+    sys.exit(1 if ms > BUDGET_MS or loaded else 0)
@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from profiler import StepProfiler  # noqa: E402
+from scenes import NUMPY_SCENES, SCENES  # noqa: E402
+from vector import Vec2  # noqa: E402
+from world import World  # noqa: E402
+
+DT = 1 / 60
+
+
+# -------------------------------
+# Measurements
+# -------------------------------
+def make_world(name):
+    build, frames, kwargs, attrs = SCENES[name]
+    world = World(**kwargs)
+    for key, value in attrs.items():
+        setattr(world, key, value)
+    build(world)
+    return world, frames
+
+
+def time_steps(name, frames):
+    world, _ = make_world(name)
+    start = time.perf_counter()
+    for _ in range(frames):
+        world.step(DT)
+    elapsed = time.perf_counter() - start
+    return world, elapsed
+
+
+def profile_phases(name, frames):
+    # Separate run, so the timed run above stays uninstrumented
+    world, _ = make_world(name)
+    world.profiler = StepProfiler()
+    for _ in range(frames):
+        world.step(DT)
+    report = world.profiler.as_dict()
+    phases = {phase: p["ms_per_step"] for phase, p in report["phases"].items()}
+    return phases, report["counters_per_step"]
+
+
+def measure_allocations(name, frames):
+    # Peak transient memory within a step, and blocks still alive after it
+    world, _ = make_world(name)
+    world.step(DT)  # let lazy caches and stores allocate first
+    tracemalloc.start()
+    peaks, retained = [], []
+    for _ in range(frames):
+        before_bytes, _ = tracemalloc.get_traced_memory()
+        before_blocks = sys.getallocatedblocks()
+        tracemalloc.reset_peak()
+        world.step(DT)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before_bytes)
+        retained.append(sys.getallocatedblocks() - before_blocks)
+    tracemalloc.stop()
+    return {
+        "peak_kib_per_step": sum(peaks) / len(peaks) / 1024,
+        "retained_blocks_per_step": sum(retained) / len(retained),
+        "vec2_per_step": count_vec2(world, frames),
+    }
+
+
+def count_vec2(world, frames):
+    # Vec2 objects created per step, temporaries included: the allocation
+    # churn the in-place Vec2 operations are meant to keep down
+    created = 0
+    init = Vec2.__init__
+
+    def counting(self, x=0.0, y=0.0):
+        nonlocal created
+        created += 1
+        init(self, x, y)
+
+    Vec2.__init__ = counting
+    try:
+        for _ in range(frames):
+            world.step(DT)
+    finally:
+        Vec2.__init__ = init
+    return created / frames
+
+
+def run_scene(name, scale=1.0):
+    frames = max(1, int(SCENES[name][1] * scale))
+    world, elapsed = time_steps(name, frames)
+    phases, counters = profile_phases(name, frames)
+    return {
+        "bodies": len(world.bodies),
+        "frames": frames,
+        "seconds": elapsed,
+        "steps_per_sec": frames / elapsed,
+        "ms_per_step": elapsed / frames * 1000,
+        "phases_ms_per_step": phases,
+        "counters_per_step": counters,
+        "allocations": measure_allocations(name, min(frames, 10)),
+    }
+
+
+# -------------------------------
+# Reporting
+# -------------------------------
+def commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # Returns the scenes whose steps/sec dropped by more than threshold
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        ratio = r["steps_per_sec"] / old["steps_per_sec"]
+        flag = "  REGRESSION" if ratio < 1 - threshold else ""
+        print(f"{name:18s} {old['steps_per_sec']:10.1f} -> {r['steps_per_sec']:10.1f} steps/s"
+              f"  ({ratio:5.2f}x){flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless World.step benchmarks")
+    parser.add_argument("scenes", nargs="*", help="scenes to run (default: all)")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply frame counts")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="steps/sec drop counted as a regression")
+    args = parser.parse_args()
+
+    names = args.scenes or list(SCENES)
+    unknown = [n for n in names if n not in SCENES]
+    if unknown:
+        parser.error("unknown scenes: " + ", ".join(unknown))
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        skipped = [n for n in names if n in NUMPY_SCENES]
+        names = [n for n in names if n not in NUMPY_SCENES]
+        if skipped:
+            print("numpy not installed, skipping:", ", ".join(skipped))
+
+    results = {}
+    for name in names:
+        r = results[name] = run_scene(name, args.scale)
+        print(f"{name:18s} {r['bodies']:5d} bodies  {r['steps_per_sec']:10.1f} steps/s"
+              f"  {r['allocations']['peak_kib_per_step']:9.1f} KiB peak/step"
+              f"  {r['allocations']['vec2_per_step']:9.0f} Vec2/step")
+
+    report = {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dt": DT,
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("wrote", args.out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
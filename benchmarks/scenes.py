@@ -0,0 +1,182 @@
+import random
+
+from body import Body
+from constraints import DistanceJoint, RopeConstraint, Spring
+from vector import Vec2
+
+
+# -------------------------------
+# Canonical scenes (the demos in main.py)
+# -------------------------------
+def two_balls(world):
+    world.bodies += [
+        Body(pos=Vec2(-2.0, 2.0), radius=0.4, mass=2.0, vel=Vec2(4.0, -5.0)),
+        Body(pos=Vec2(2.0, 2.0), radius=0.4, mass=2.0, vel=Vec2(-6.0, -5.0)),
+        Body(pos=Vec2(-0.5, 2.69), radius=0.4, mass=5.0, vel=Vec2(3.0, -4.5)),
+    ]
+
+
+def box_box_impulse(world):
+    world.bodies += [
+        Body(pos=Vec2(-2, -2), mass=1, vel=Vec2(7, 4), width=1, height=1),
+        Body(pos=Vec2(1, -2), mass=1, vel=Vec2(0, 2), width=1, height=1),
+    ]
+
+
+def offset_box_drop(world):
+    world.bodies += [
+        Body(pos=Vec2(0, -3), mass=0, width=1, height=1),
+        Body(pos=Vec2(0.8, 0), mass=1, width=1, height=1),
+    ]
+
+
+def distance_joint(world):
+    a = Body(pos=Vec2(-2, 0), width=1, height=1, mass=1)
+    b = Body(pos=Vec2(2, 0), width=1, height=1, mass=1)
+    a.vel = Vec2(2, 1)
+    b.vel = Vec2(0, -2)
+    world.bodies += [a, b]
+    world.constraints.append(DistanceJoint(a, b, length=4.0, stiffness=1.0))
+
+
+def rope_chain(world):
+    anchor = Body(pos=Vec2(0, 3), width=0.6, height=0.6, mass=0)
+    b1 = Body(Vec2(0, 2), width=0.6, height=0.6, mass=1)
+    b2 = Body(Vec2(0, 1), width=0.3, height=0.3, mass=0.5)
+    b3 = Body(Vec2(0, 0), width=1, height=1, mass=5)
+    world.bodies += [anchor, b1, b2, b3]
+    world.constraints += [RopeConstraint(anchor, b1, 1.0, break_threshold=0.15),
+                          RopeConstraint(b1, b2, 1.0, break_threshold=0.15),
+                          RopeConstraint(b2, b3, 1.0, break_threshold=0.15)]
+
+
+def spring(world):
+    anchor = Body(pos=Vec2(0, 3), mass=0, radius=0.1)
+    box = Body(pos=Vec2(0, 1), mass=4, width=1, height=1)
+    world.bodies += [anchor, box]
+    world.springs.append(Spring(a=anchor, b=box, k=20.0, c=2.0, rest=2.0))
+
+
+# -------------------------------
+# Scaled-up scenes
+# -------------------------------
+def circles(world, n, seed=1):
+    # n small balls dropped over a 20 m wide area, denser as n grows
+    rng = random.Random(seed)
+    top = -2.5 + n * 0.02
+    for _ in range(n):
+        world.bodies.append(Body(pos=Vec2(rng.uniform(-10, 10), rng.uniform(-2.5, top)),
+                                 radius=0.1, mass=1))
+
+
+def circle_pile(world, rows=24, cols=24):
+    # Tightly packed balls between two walls, touching from the first frame
+    world.bodies.append(Body(pos=Vec2(-6, 0), mass=0, width=0.5, height=8))
+    world.bodies.append(Body(pos=Vec2(6, 0), mass=0, width=0.5, height=8))
+    for row in range(rows):
+        for col in range(cols):
+            x = -5.5 + col * 0.46 + (0.23 if row % 2 else 0)
+            world.bodies.append(Body(pos=Vec2(x, -2.75 + row * 0.4), radius=0.22, mass=1))
+
+
+def box_stack(world, height=20):
+    for i in range(height):
+        world.bodies.append(Body(pos=Vec2(0.01 * (i % 2), -2.5 + 1.0 * i),
+                                 mass=1, width=1, height=1))
+
+
+def long_rope(world, links=200):
+    # Horizontal chain of small balls hanging from a static anchor
+    spacing = 0.05
+    prev = Body(pos=Vec2(-5, 4), mass=0, radius=0.02)
+    world.bodies.append(prev)
+    for i in range(1, links + 1):
+        link = Body(pos=Vec2(-5 + spacing * i, 4), mass=0.1, radius=0.02)
+        world.bodies.append(link)
+        world.constraints.append(RopeConstraint(prev, link, spacing))
+        prev = link
+
+
+def cloth(world, size=30):
+    # size x size lattice of DistanceJoints, pinned at every fifth top node
+    spacing = 0.1
+    grid = {}
+    for i in range(size):
+        for j in range(size):
+            pinned = j == 0 and i % 5 == 0
+            node = Body(pos=Vec2(-1.5 + spacing * i, 4 - spacing * j),
+                        mass=0 if pinned else 0.05, radius=0.02)
+            grid[i, j] = node
+            world.bodies.append(node)
+    for i in range(size):
+        for j in range(size):
+            if i + 1 < size:
+                world.constraints.append(DistanceJoint(grid[i, j], grid[i + 1, j], spacing))
+            if j + 1 < size:
+                world.constraints.append(DistanceJoint(grid[i, j], grid[i, j + 1], spacing))
+
+
+def soft_body(world, size=20, network=False):
+    # size x size mass-spring mesh with shear springs, hung from one anchor.
+    # network=True puts the springs in a SpringNetwork instead of the list.
+    spacing = 0.15
+    grid = {}
+    for i in range(size):
+        for j in range(size):
+            node = Body(pos=Vec2(-1.5 + spacing * i + 0.01 * j, 1 + spacing * j),
+                        mass=0.1, radius=0.05)
+            grid[i, j] = node
+            world.bodies.append(node)
+    springs = []
+    for (i, j), node in grid.items():
+        for di, dj in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            other = grid.get((i + di, j + dj))
+            if other is not None:
+                rest = spacing * (2 ** 0.5 if di and dj else 1)
+                springs.append(Spring(node, other, k=300.0, c=0.5, rest=rest))
+    anchor = Body(pos=Vec2(0, 6), mass=0, radius=0.1)
+    world.bodies.append(anchor)
+    springs.append(Spring(anchor, grid[size // 2, size - 1], k=50.0, c=1.0, rest=2.0))
+
+    if network:
+        from spring_network import SpringNetwork
+        world.spring_networks.append(SpringNetwork.from_springs(world.bodies, springs))
+    else:
+        world.springs += springs
+
+
+# -------------------------------
+# Registry
+# -------------------------------
+# Warm-started box contacts converge at far lower settings than the World
+# defaults (10 iterations, 8 substeps), which ropes and joints still need
+# to hold their lengths
+BOX_SOLVER = {"iterations": 4, "substeps": 2}
+
+# name -> (build, frames, World kwargs, World attributes)
+SCENES = {
+    "two_balls": (two_balls, 120, {}, {}),
+    "box_box_impulse": (box_box_impulse, 120, {}, BOX_SOLVER),
+    "offset_box_drop": (offset_box_drop, 120, {}, BOX_SOLVER),
+    "distance_joint": (distance_joint, 120, {}, {}),
+    "rope_chain": (rope_chain, 120, {}, {}),
+    "spring": (spring, 120, {}, {}),
+    "circles_100": (lambda w: circles(w, 100), 60, {}, {}),
+    "circles_1k": (lambda w: circles(w, 1000), 10, {}, {}),
+    "circles_5k": (lambda w: circles(w, 5000), 3, {}, {}),
+    "circles_1k_batch": (lambda w: circles(w, 1000), 10, {}, {"circle_solver": "batch"}),
+    "circles_5k_batch": (lambda w: circles(w, 5000), 3, {}, {"circle_solver": "batch"}),
+    "circle_pile": (circle_pile, 30, {}, {}),
+    "circle_pile_batch": (circle_pile, 30, {}, {"circle_solver": "batch"}),
+    "box_stack_20": (box_stack, 120, {}, BOX_SOLVER),
+    "rope_200": (long_rope, 60, {}, {}),
+    "rope_200_batch": (long_rope, 60, {}, {"constraint_solver": "batch"}),
+    "cloth_30": (cloth, 10, {}, {}),
+    "cloth_30_batch": (cloth, 10, {}, {"constraint_solver": "batch"}),
+    "soft_body_20": (soft_body, 10, {}, {}),
+    "soft_body_20_network": (lambda w: soft_body(w, network=True), 10, {}, {}),
+}
+
+# Variants that need numpy
+NUMPY_SCENES = {"circles_1k_batch", "circles_5k_batch", "circle_pile_batch", "rope_200_batch",
+                "cloth_30_batch", "soft_body_20_network"}
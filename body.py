@@ -1,12 +1,21 @@
-from geometry import box_vertices, box_axes
+from geometry import box_local_vertices, transform_vertices, polygon_normals, polygon_properties
 from vector import Vec2
 import math
 
+# Integer shape types; collision dispatch tables are keyed by these
+CIRCLE = 0
+BOX = 1
+POLYGON = 2
+
 
 class Body:
-    def __init__(self, pos, mass, vel=None, radius=None, width=None, height=None):
-        self.pos = pos
-        self.vel = vel if vel else Vec2(0, 0)
+    # Shape: radius for a circle, width/height for a box, or vertices (a
+    # convex polygon, local (x, y) points around pos) for a polygon
+    def __init__(self, pos, mass, vel=None, radius=None, width=None, height=None, vertices=None):
+        # Own copies: pos, vel and force are updated in place, so a Vec2
+        # passed to two bodies must not tie them together
+        self.pos = Vec2(pos.x, pos.y)
+        self.vel = Vec2(vel.x, vel.y) if vel else Vec2(0, 0)
         self.mass = mass
 
         self.angle = 0.0
@@ -19,46 +28,109 @@ class Body:
 
         self.force = Vec2(0, 0)
 
+        # Sleeping: once a body (and everything touching or jointed to it)
+        # stays below these speeds for time_to_sleep seconds, World.step
+        # stops simulating it until something wakes it
+        self.awake = True
+        self.sleep_time = 0.0
+        self.sleep_linear_threshold = 0.05
+        self.sleep_angular_threshold = 0.1
+        self.time_to_sleep = 0.5
+
+        # Bullets get continuous collision detection: each substep their
+        # motion is clamped at the first time of impact (see ccd.py), so
+        # they can't tunnel however few substeps the world runs
+        self.bullet = False
+
         self.radius = radius
         self.width = width
         self.height = height
 
-        self.shape = "circle" if radius is not None else "box"
+        if radius is not None:
+            self.shape, self.shape_type = "circle", CIRCLE
+            local = []
+            self.area = math.pi * radius ** 2
+            unit_inertia = 0.5 * radius ** 2
+        elif vertices is not None:
+            self.shape, self.shape_type = "polygon", POLYGON
+            # Local geometry is recentred on the centroid, which becomes the
+            # body's position; width/height are the local bounding box
+            local, self.area, (cx, cy), unit_inertia = polygon_properties(vertices)
+            self.pos = Vec2(pos.x + cx, pos.y + cy)
+            self.width = max(x for x, _ in local) - min(x for x, _ in local)
+            self.height = max(y for _, y in local) - min(y for _, y in local)
+        else:
+            self.shape, self.shape_type = "box", BOX
+            local = box_local_vertices(width, height)
+            self.area = width * height
+            unit_inertia = (width ** 2 + height ** 2) / 12
+
+        # Precomputed once: local vertices (counter-clockwise) and outward
+        # edge normals; the cache below only rotates and translates them
+        self._local_vertices = local
+        self._local_normals = polygon_normals(local) if local else []
+        self.bounding_radius = radius if radius is not None else max(math.hypot(x, y) for x, y in local)
+
+        # Transform cache. Pose is mutated in place all over the solver
+        # (body.pos.y += ...), so entries are validated against the pose they
+        # were built from instead of relying on setters to mark them dirty.
+        self._rot_angle = None
+        self._rot = (1.0, 0.0)
+        self._axes = []
+        self._vert_pose = None
+        self._vertices = []
 
         if mass <= 0:
             self.inv_mass = 0.0
             self.inv_inertia = 0.0
         else:
             self.inv_mass = 1.0 / mass
-            if self.shape == "circle":
-                # Circle inertia: 0.5 * m * r^2
-                inertia = 0.5 * mass * radius ** 2
-            else:
-                # Box inertia: m * (w^2 + h^2) / 12
-                inertia = (mass * (width ** 2 + height ** 2)) / 12
-            self.inv_inertia = 1.0 / inertia
+            # Circle: 0.5 * m * r^2, box: m * (w^2 + h^2) / 12, polygon:
+            # from its triangle decomposition
+            self.inv_inertia = 1.0 / (mass * unit_inertia)
 
     def apply_force(self, f):
         if self.inv_mass == 0:
             return
+        if not self.awake and (f.x or f.y):
+            self.wake()
         self.force += f
 
     def apply_torque(self, t):
+        if not self.awake and t:
+            self.wake()
         self.torque += t
 
+    def is_active(self):
+        # Dynamic and awake: the bodies World.step actually simulates
+        return self.inv_mass != 0 and self.awake
+
+    def wake(self):
+        self.awake = True
+        self.sleep_time = 0.0
+
+    def sleep(self):
+        self.awake = False
+        self.vel = Vec2(0, 0)
+        self.ang_vel = 0.0
+        self.force = Vec2(0, 0)
+        self.torque = 0.0
+
     def integrate(self, dt):
-        if self.inv_mass == 0:
+        if self.inv_mass == 0 or not self.awake:
             return
 
-        # Linear Integration
-        acc = self.force * self.inv_mass
-        self.vel += acc * dt
+        # Linear Integration, in place (no Vec2 temporaries). Same operation
+        # order as BodyStore.integrate: (force * inv_mass) * dt.
+        vel, force = self.vel, self.force
+        vel.x += force.x * self.inv_mass * dt
+        vel.y += force.y * self.inv_mass * dt
 
         # Apply Linear Damping (Air resistance)
-        self.vel *= max(0.0, 1.0 - self.linear_damping * dt)
+        vel *= max(0.0, 1.0 - self.linear_damping * dt)
 
-        self.pos += self.vel * dt
-        self.force = Vec2(0, 0)
+        self.pos.add_scaled(vel, dt)
+        force.set(0.0, 0.0)
 
         # Angular Integration
         ang_acc = self.torque * self.inv_inertia
@@ -71,16 +143,34 @@ class Body:
         self.torque = 0.0
 
 
+    def get_rotation(self):
+        # (cos, sin) of the current angle, one trig evaluation per angle change
+        angle = self.angle
+        if angle != self._rot_angle:
+            self._rot = (math.cos(angle), math.sin(angle))
+            self._rot_angle = angle
+            if self._local_normals:
+                self._axes = transform_vertices(self._local_normals, 0.0, 0.0, *self._rot)
+        return self._rot
+
+    # The lists below are shared cache entries: read them, don't mutate them.
     def get_vertices(self):
-        if self.shape != "box":
+        if not self._local_vertices:
             return []
-        return box_vertices(self)
+        pos = self.pos
+        pose = (pos.x, pos.y, self.angle)
+        if pose != self._vert_pose:
+            c, s = self.get_rotation()
+            self._vertices = transform_vertices(self._local_vertices, pose[0], pose[1], c, s)
+            self._vert_pose = pose
+        return self._vertices
 
     def get_axes(self):
-        if self.shape != "box":
+        # Outward edge normals, in vertex order
+        if not self._local_normals:
             return []
-        verts = box_vertices(self)
-        return box_axes(verts)
+        self.get_rotation()
+        return self._axes
 
     def is_circle(self):
         return hasattr(self, "radius") and self.radius is not None
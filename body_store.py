@@ -0,0 +1,102 @@
+from itertools import chain
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the array-backed store
+    np = None
+
+
+# Columns of the state array, in the order load() reads them
+VEC_FIELDS = ("pos", "vel", "force")
+SCALAR_FIELDS = ("angle", "ang_vel", "torque", "mass", "inv_mass", "inv_inertia",
+                 "linear_damping", "angular_damping")
+_ROW = attrgetter(*(f"{name}.{axis}" for name in VEC_FIELDS for axis in "xy"), *SCALAR_FIELDS)
+_WIDTH = 2 * len(VEC_FIELDS) + len(SCALAR_FIELDS)
+
+
+# -------------------------------
+# Structure-of-arrays store
+# -------------------------------
+class BodyStore:
+    # Array copy of the bodies' dynamic state for the vectorized phases of a
+    # substep. Bodies stay plain Body objects, so narrowphase, the contact
+    # and joint solvers and Spring objects run at full speed: load() gathers
+    # every body once before gravity, spring networks and integration, and
+    # save() writes the integrated rows back. Between the two the arrays are
+    # authoritative; outside them they are stale.
+    def __init__(self):
+        if np is None:
+            raise ImportError("BodyStore requires numpy")
+        self.bodies = []
+        self.fresh = False
+        self._allocate(np.zeros((0, _WIDTH)))
+
+    def _allocate(self, state):
+        # Each field is a column view of the one gathered array
+        for k, name in enumerate(VEC_FIELDS):
+            setattr(self, name, state[:, 2 * k:2 * k + 2])
+        for k, name in enumerate(SCALAR_FIELDS, 2 * len(VEC_FIELDS)):
+            setattr(self, name, state[:, k])
+        self.dynamic = np.flatnonzero(self.inv_mass != 0)
+
+    def load(self, bodies):
+        # Bodies -> arrays, one C-level getter call per body
+        state = np.fromiter(chain.from_iterable(map(_ROW, bodies)), dtype=float,
+                            count=len(bodies) * _WIDTH)
+        self._allocate(state.reshape(-1, _WIDTH))
+        self.bodies = bodies
+        self.fresh = True
+
+    def save(self, index=None):
+        # Arrays -> bodies for the rows integrate() moved. Vec2s are updated
+        # in place, as Body.integrate does.
+        d = self.dynamic if index is None else index
+        self.fresh = False
+        if len(d) == 0:
+            return
+        bodies = self.bodies
+        rows = np.column_stack((self.pos[d], self.vel[d], self.angle[d], self.ang_vel[d]))
+        for k, (x, y, vx, vy, angle, ang_vel) in zip(d.tolist(), rows.tolist()):
+            b = bodies[k]
+            pos, vel, force = b.pos, b.vel, b.force
+            pos.x, pos.y = x, y
+            vel.x, vel.y = vx, vy
+            force.x = force.y = 0.0
+            b.angle = angle
+            b.ang_vel = ang_vel
+            b.torque = 0.0
+
+    # -------------------------------
+    # Vectorized force / integration
+    # -------------------------------
+    def active(self):
+        # Indices of dynamic bodies that are awake
+        awake = np.fromiter((b.awake for b in self.bodies), dtype=bool, count=len(self.bodies))
+        return np.flatnonzero(awake & (self.inv_mass != 0))
+
+    # index: optional subset of body indices (e.g. awake bodies only);
+    # defaults to every dynamic body
+    def apply_gravity(self, gravity, index=None):
+        d = self.dynamic if index is None else index
+        self.force[d] += np.outer(self.mass[d], (gravity.x, gravity.y))
+
+    def integrate(self, dt, index=None):
+        # Same update as Body.integrate, for every dynamic body at once
+        d = self.dynamic if index is None else index
+        if len(d) == 0:
+            return
+
+        vel = self.vel[d]
+        vel += self.force[d] * self.inv_mass[d, None] * dt
+        vel *= np.maximum(0.0, 1.0 - self.linear_damping[d] * dt)[:, None]
+        self.vel[d] = vel
+        self.pos[d] += vel * dt
+        self.force[d] = 0.0
+
+        ang_vel = self.ang_vel[d]
+        ang_vel += self.torque[d] * self.inv_inertia[d] * dt
+        ang_vel *= np.maximum(0.0, 1.0 - self.angular_damping[d] * dt)
+        self.ang_vel[d] = ang_vel
+        self.angle[d] += ang_vel * dt
+        self.torque[d] = 0.0
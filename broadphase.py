@@ -0,0 +1,127 @@
+import math
+
+
+# -------------------------------
+# AABB helpers
+# -------------------------------
+def body_aabb(body, margin=0.0):
+    # (min_x, min_y, max_x, max_y) of the body, fattened by margin
+    x, y = body.pos.x, body.pos.y
+    if body.shape == "circle":
+        r = body.radius + margin
+        return x - r, y - r, x + r, y + r
+    if body.shape == "polygon":
+        verts = body.get_vertices()
+        xs = [v.x for v in verts]
+        ys = [v.y for v in verts]
+        return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+    c = abs(math.cos(body.angle))
+    s = abs(math.sin(body.angle))
+    hx = 0.5 * (body.width * c + body.height * s) + margin
+    hy = 0.5 * (body.width * s + body.height * c) + margin
+    return x - hx, y - hy, x + hx, y + hy
+
+
+def aabb_overlap(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _both_inactive(bodies, i, j):
+    # Static or sleeping on both sides: nothing to solve
+    return not bodies[i].is_active() and not bodies[j].is_active()
+
+
+# -------------------------------
+# Broadphases
+# -------------------------------
+# Every broadphase exposes pairs(bodies), returning candidate (i, j) index
+# pairs with i < j, sorted so the solver visits them in the same order as
+# the old nested loop. Pairs where neither body is active (static or
+# asleep) are never reported.
+
+class BruteForce:
+    def pairs(self, bodies):
+        n = len(bodies)
+        return [(i, j) for i in range(n) for j in range(i + 1, n)
+                if not _both_inactive(bodies, i, j)]
+
+
+class SpatialHash:
+    def __init__(self, cell_size=1.0, margin=0.05):
+        self.cell_size = cell_size
+        self.margin = margin
+
+    def pairs(self, bodies):
+        inv_cell = 1.0 / self.cell_size
+        aabbs = [body_aabb(b, self.margin) for b in bodies]
+
+        grid = {}
+        for idx, (x0, y0, x1, y1) in enumerate(aabbs):
+            cx0, cx1 = math.floor(x0 * inv_cell), math.floor(x1 * inv_cell)
+            cy0, cy1 = math.floor(y0 * inv_cell), math.floor(y1 * inv_cell)
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cell = grid.get((cx, cy))
+                    if cell is None:
+                        grid[(cx, cy)] = [idx]
+                    else:
+                        cell.append(idx)
+
+        # Bodies spanning several cells meet more than once, hence the set
+        found = set()
+        for cell in grid.values():
+            m = len(cell)
+            for p in range(m):
+                i = cell[p]
+                for q in range(p + 1, m):
+                    j = cell[q]
+                    if _both_inactive(bodies, i, j):
+                        continue
+                    if aabb_overlap(aabbs[i], aabbs[j]):
+                        found.add((i, j) if i < j else (j, i))
+        return sorted(found)
+
+
+class SweepAndPrune:
+    def __init__(self, margin=0.05):
+        self.margin = margin
+        # Body indices sorted on min x, kept between calls so the insertion
+        # sort below only has to fix up the few bodies that moved past each other
+        self.order = []
+
+    def pairs(self, bodies):
+        aabbs = [body_aabb(b, self.margin) for b in bodies]
+        n = len(bodies)
+
+        order = self.order
+        if len(order) != n:
+            order = list(range(n))
+
+        # Insertion sort: O(n) on the nearly sorted order from the last substep
+        for k in range(1, n):
+            idx = order[k]
+            key = aabbs[idx][0]
+            m = k - 1
+            while m >= 0 and aabbs[order[m]][0] > key:
+                order[m + 1] = order[m]
+                m -= 1
+            order[m + 1] = idx
+        self.order = order
+
+        found = []
+        for k in range(n):
+            i = order[k]
+            box_i = aabbs[i]
+            for m in range(k + 1, n):
+                j = order[m]
+                box_j = aabbs[j]
+                if box_j[0] > box_i[2]:
+                    break
+                if box_i[1] > box_j[3] or box_j[1] > box_i[3]:
+                    continue
+                if _both_inactive(bodies, i, j):
+                    continue
+                found.append((i, j) if i < j else (j, i))
+        found.sort()
+        return found
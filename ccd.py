@@ -0,0 +1,185 @@
+import math
+
+from broadphase import aabb_overlap, body_aabb
+from geometry import transform_vertices
+
+# Depth a bullet is left at when its motion is clamped, so the regular
+# narrowphase picks the contact up in the same substep
+TOI_TARGET = 0.005
+TOI_TOLERANCE = 1e-3
+MAX_ADVANCEMENT_STEPS = 30
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+# Poses are (x, y, angle) tuples. The bullet moves linearly from its start
+# pose to its end pose over the substep; other bodies are held at their
+# current pose.
+def lerp_pose(start, end, t):
+    return tuple(s + (e - s) * t for s, e in zip(start, end))
+
+
+def _extent(body):
+    # Farthest point of the shape from its center
+    if body.shape == "circle":
+        return body.radius
+    return body.bounding_radius
+
+
+def _polygon_at(body, pose):
+    # World vertices and edge normals of a box or polygon at pose
+    x, y, angle = pose
+    c, s = math.cos(angle), math.sin(angle)
+    return (transform_vertices(body._local_vertices, x, y, c, s),
+            transform_vertices(body._local_normals, 0.0, 0.0, c, s))
+
+
+def _gap_polygons(verts_a, axes_a, verts_b, axes_b):
+    # Largest separation over the SAT axes: positive while apart (a lower
+    # bound on the true distance), minus the overlap depth once touching
+    gap = -math.inf
+    for axis in axes_a + axes_b:
+        da = [v.dot(axis) for v in verts_a]
+        db = [v.dot(axis) for v in verts_b]
+        gap = max(gap, min(db) - max(da), min(da) - max(db))
+    return gap
+
+
+def _gap_circle_box(cx, cy, radius, box_pose, width, height):
+    # Signed distance from a circle to an oriented box
+    x, y, angle = box_pose
+    c, s = math.cos(angle), math.sin(angle)
+    dx, dy = cx - x, cy - y
+    lx, ly = dx * c + dy * s, dy * c - dx * s
+    hw, hh = width / 2, height / 2
+    ox, oy = abs(lx) - hw, abs(ly) - hh
+    if ox > 0 or oy > 0:
+        return math.hypot(max(ox, 0.0), max(oy, 0.0)) - radius
+    return max(ox, oy) - radius
+
+
+def _gap_circle_polygon(cx, cy, radius, verts, axes):
+    # Largest face separation: a lower bound on the distance, exact inside
+    # and in front of the faces
+    return max(n.x * (cx - v.x) + n.y * (cy - v.y) for v, n in zip(verts, axes)) - radius
+
+
+def _gap_circle(cx, cy, radius, body, pose):
+    if body.shape == "box":
+        return _gap_circle_box(cx, cy, radius, pose, body.width, body.height)
+    verts, axes = _polygon_at(body, pose)
+    return _gap_circle_polygon(cx, cy, radius, verts, axes)
+
+
+# -------------------------------
+# Time-of-impact queries
+# -------------------------------
+# Each returns the earliest t in [0, 1] at which the bullet reaches
+# TOI_TARGET depth, or None. Pairs already touching at t = 0 return None:
+# they are the regular narrowphase's job.
+def toi_circle_ground(radius, start, end, ground_y):
+    y0 = start[1] - radius - ground_y
+    y1 = end[1] - radius - ground_y
+    if y0 <= 0 or y1 > -TOI_TARGET:
+        return None
+    return (y0 + TOI_TARGET) / (y0 - y1)
+
+
+def toi_swept_circles(radius, start, end, center):
+    # Moving circle against a circle at center; radius is the sum of radii
+    d0x, d0y = start[0] - center[0], start[1] - center[1]
+    ux, uy = end[0] - start[0], end[1] - start[1]
+    reach = radius - TOI_TARGET
+    a = ux * ux + uy * uy
+    b = 2 * (d0x * ux + d0y * uy)
+    dist_sq = d0x * d0x + d0y * d0y
+    if dist_sq <= radius * radius or a == 0:
+        return None
+    c = dist_sq - reach * reach
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2 * a)
+    return t if 0 <= t <= 1 else None
+
+
+def conservative_advancement(distance, bound):
+    # distance(t): signed distance (or a lower bound of it) at time t.
+    # bound: most the distance can shrink over the whole step. Stepping by
+    # (distance - target) / bound can never jump past the target depth.
+    if bound <= 0 or distance(0.0) <= 0:
+        return None
+    target = -TOI_TARGET
+    t = 0.0
+    for _ in range(MAX_ADVANCEMENT_STEPS):
+        d = distance(t)
+        if d <= target + TOI_TOLERANCE:
+            return t
+        t += (d - target) / bound
+        if t > 1:
+            return None
+    return t
+
+
+def _motion_bound(body, start, end):
+    travel = math.hypot(end[0] - start[0], end[1] - start[1])
+    if body.shape == "circle":
+        return travel
+    return travel + abs(end[2] - start[2]) * _extent(body)
+
+
+def toi_ground(body, start, end, ground_y):
+    if body.shape == "circle":
+        return toi_circle_ground(body.radius, start, end, ground_y)
+
+    def distance(t):
+        verts, _ = _polygon_at(body, lerp_pose(start, end, t))
+        return min(v.y for v in verts) - ground_y
+
+    return conservative_advancement(distance, _motion_bound(body, start, end))
+
+
+def toi_body(body, start, end, other):
+    pose = (other.pos.x, other.pos.y, other.angle)
+    if body.shape == "circle" and other.shape == "circle":
+        return toi_swept_circles(body.radius + other.radius, start, end, pose)
+
+    if body.shape == "circle":
+        def distance(t):
+            x, y, _ = lerp_pose(start, end, t)
+            return _gap_circle(x, y, body.radius, other, pose)
+    elif other.shape == "circle":
+        def distance(t):
+            return _gap_circle(pose[0], pose[1], other.radius, body, lerp_pose(start, end, t))
+    else:
+        verts_b, axes_b = _polygon_at(other, pose)
+
+        def distance(t):
+            verts_a, axes_a = _polygon_at(body, lerp_pose(start, end, t))
+            return _gap_polygons(verts_a, axes_a, verts_b, axes_b)
+
+    return conservative_advancement(distance, _motion_bound(body, start, end))
+
+
+def swept_aabb(body, start, end):
+    r = _extent(body)
+    return (min(start[0], end[0]) - r, min(start[1], end[1]) - r,
+            max(start[0], end[0]) + r, max(start[1], end[1]) + r)
+
+
+def time_of_impact(body, start, end, bodies, ground_y=None):
+    # Earliest impact of a bullet moving from start to end against the
+    # ground plane and every body whose AABB meets its swept AABB
+    best = None
+    if ground_y is not None:
+        best = toi_ground(body, start, end, ground_y)
+
+    sweep = swept_aabb(body, start, end)
+    for other in bodies:
+        if other is body or not aabb_overlap(sweep, body_aabb(other)):
+            continue
+        t = toi_body(body, start, end, other)
+        if t is not None and (best is None or t < best):
+            best = t
+    return best
@@ -1,310 +1,339 @@
 from vector import Vec2
-from geometry import box_vertices, box_axes
+from body import BOX, CIRCLE, POLYGON
+from manifold import Contact, Ground, Manifold
+
+# Distance within which a clipped polygon point still counts as touching
+CONTACT_SLOP = 0.01
 
 
 # -------------------------------
 # Helper functions
 # -------------------------------
-def project(vertices, axis):
-    dots = [v.dot(axis) for v in vertices]
-    return min(dots), max(dots)
-
-
-def overlap(minA, maxA, minB, maxB):
-    return min(maxA, maxB) - max(minA, minB)
-
-
-def sat_box_box(a, b):
-    axes = a.get_axes() + b.get_axes()
-    min_overlap = float('inf')
-    collision_normal = None
-
-    for axis in axes:
-        axis_n = axis.normalized()
-        minA, maxA = project(a.get_vertices(), axis_n)
-        minB, maxB = project(b.get_vertices(), axis_n)
-
-        o = overlap(minA, maxA, minB, maxB)
-
-        if o <= 0:
-            return None
-        if o < min_overlap:
-            min_overlap = o
-            collision_normal = axis_n
-
-    d = b.pos - a.pos
-    if d.dot(collision_normal) < 0:
-        collision_normal = collision_normal * -1
-
-    return collision_normal, min_overlap
-
-
-def point_inside_box(p, box):
-    verts = box_vertices(box)
-    axes = box_axes(verts)
-    for axis in axes:
-        min_proj, max_proj = min(v.dot(axis) for v in verts), max(v.dot(axis) for v in verts)
-        proj_p = p.dot(axis)
-        # Using a small epsilon handles "touching" cases better
-        if proj_p < min_proj - 1e-5 or proj_p > max_proj + 1e-5:
-            return False
-    return True
+def _max_separation(a, b):
+    # Deepest point of b against each edge plane of a: the largest of those
+    # separations and its edge index. Positive means a separating axis.
+    verts_a = a.get_vertices()
+    verts_b = b.get_vertices()
+    best, best_edge = -float('inf'), 0
+    for i, n in enumerate(a.get_axes()):
+        v = verts_a[i]
+        nx, ny = n.x, n.y
+        offset = v.x * nx + v.y * ny
+        sep = min(w.x * nx + w.y * ny for w in verts_b) - offset
+        if sep > best:
+            best, best_edge = sep, i
+    return best, best_edge
+
+
+def sat_polygons(a, b):
+    # SAT over the edge normals of both convex shapes (boxes included).
+    # Returns (normal from a to b, penetration) or None when separated.
+    sep_a, edge_a = _max_separation(a, b)
+    if sep_a > 0:
+        return None
+    sep_b, edge_b = _max_separation(b, a)
+    if sep_b > 0:
+        return None
+    if sep_b > sep_a:
+        return b.get_axes()[edge_b] * -1, -sep_b
+    return a.get_axes()[edge_a], -sep_a
+
+
+def resolve_manifold(manifold, iterations=1):
+    # Standalone contact resolution: velocity iterations, then one position
+    # pass. World.step runs the same stages over all manifolds at once.
+    if manifold is None:
+        return
+    manifold.pre_step()
+    for _ in range(iterations):
+        manifold.solve()
+    manifold.correct_positions()
 
 
 # -------------------------------
 # Circle-ground collision
 # -------------------------------
-def resolve_ground_contact(body, ground_y, restitution=0.3, mu=0.6):
+def circle_ground_manifold(body, ground, restitution=0.3, mu=0.6):
     if body.inv_mass == 0:
-        return
+        return None
 
+    ground_y = ground.pos.y
     bottom = body.pos.y - body.radius
     if bottom > ground_y:
-        return
+        return None
+
+    # Friction acts on the contact point velocity (v + w x r), so a ball
+    # that rolls without slipping feels no friction impulse
+    contact = Contact(Vec2(body.pos.x, ground_y), 0, bottom - ground_y)
+    return Manifold(ground, body, Vec2(0, 1), [contact], restitution, mu,
+                    penetration=ground_y - bottom)
 
-    n = Vec2(0, 1)  # Ground points UP
-    contact = Vec2(body.pos.x, ground_y)
-    r = contact - body.pos
-
-    v_contact = body.vel + r.perp() * body.ang_vel
-    vn = v_contact.dot(n)
-
-    jn = 0.0
-    if vn < 0:
-        ra_cn = r.perp().dot(n)
-        inv_mass = body.inv_mass + ra_cn ** 2 * body.inv_inertia
-        jn = -(1 + restitution) * vn / inv_mass
-        body.vel += n * (jn * body.inv_mass)
-        body.ang_vel += body.inv_inertia * r.perp().dot(n * jn)
-
-    # Friction
-    tangent = Vec2(1, 0)
-    vt = v_contact.dot(tangent)
-
-    # Check simple friction condition
-    if abs(vt) > 0.001 and jn > 0:
-        inv_mass = body.inv_mass + (body.radius ** 2) * body.inv_inertia
-        if body.is_circle():
-            # Rolling friction model
-            target_vt = body.ang_vel * body.radius
-            slip = vt - target_vt
-            jt = -slip / inv_mass
-            max_f = mu * jn
-            jt = max(-max_f, min(max_f, jt))
-
-            body.vel += tangent * (jt * body.inv_mass)
-            body.ang_vel -= (jt * body.radius) * body.inv_inertia
-        else:
-            # Sliding friction
-            jt = -vt / inv_mass
-            max_f = mu * jn
-            jt = max(-max_f, min(max_f, jt))
-            body.vel += tangent * (jt * body.inv_mass)
-            body.ang_vel += body.inv_inertia * r.perp().dot(tangent * jt)
 
-    # Positional Correction
-    penetration = ground_y - bottom
-    if penetration > 0:
-        body.pos.y += penetration
+def resolve_ground_contact(body, ground_y, restitution=0.3, mu=0.6):
+    resolve_manifold(circle_ground_manifold(body, Ground(ground_y), restitution, mu))
 
 
 # -------------------------------
 # Circle-circle collision
 # -------------------------------
-def resolve_circle_circle(a, b, restitution=0.6, mu=0.5):
+def circle_circle_manifold(a, b, restitution=0.6, mu=0.5):
     if a.inv_mass == 0 and b.inv_mass == 0:
-        return
+        return None
 
     delta = b.pos - a.pos
     dist = delta.length()
     min_dist = a.radius + b.radius
 
     if dist == 0 or dist > min_dist:
-        return
+        return None
 
     n = delta * (1 / dist)
-    contact = a.pos + n * a.radius
-    ra = contact - a.pos
-    rb = contact - b.pos
-
-    va = a.vel + ra.perp() * a.ang_vel
-    vb = b.vel + rb.perp() * b.ang_vel
-    rv = vb - va
-    vn = rv.dot(n)
-    if vn > 0: return
-
-    ra_cn = ra.dot(n.perp())
-    rb_cn = rb.dot(n.perp())
-    inv_mass_sum = a.inv_mass + b.inv_mass + ra_cn ** 2 * a.inv_inertia + rb_cn ** 2 * b.inv_inertia
-
-    j = -(1 + restitution) * vn / inv_mass_sum
-    impulse = n * j
-
-    a.vel -= impulse * a.inv_mass
-    b.vel += impulse * b.inv_mass
-    a.ang_vel -= a.inv_inertia * ra.dot(impulse.perp())
-    b.ang_vel += b.inv_inertia * rb.dot(impulse.perp())
-
-    # Friction
-    t = (rv - n * vn)
-    if t.length() > 1e-8:
-        t = t.normalized()
-        vt = rv.dot(t)
-        jt = -vt / inv_mass_sum
-        jt = max(-mu * j, min(mu * j, jt))
-        f_impulse = t * jt
-        a.vel -= f_impulse * a.inv_mass
-        b.vel += f_impulse * b.inv_mass
-        a.ang_vel -= a.inv_inertia * ra.dot(f_impulse.perp())
-        b.ang_vel += b.inv_inertia * rb.dot(f_impulse.perp())
-
-    pen = min_dist - dist
-    if pen > 0:
-        corr = n * (pen * 0.5)
-        a.pos -= corr
-        b.pos += corr
+    contact = Contact(a.pos + n * a.radius, 0, dist - min_dist)
+    return Manifold(a, b, n, [contact], restitution, mu, penetration=min_dist - dist)
+
+
+def resolve_circle_circle(a, b, restitution=0.6, mu=0.5):
+    resolve_manifold(circle_circle_manifold(a, b, restitution, mu))
 
 
 # -------------------------------
 # Box-ground collision
 # -------------------------------
-def resolve_box_ground_contact(box, ground_y, restitution=0.4, mu=0.5):
-    if box.inv_mass == 0: return
+def box_ground_manifold(box, ground, restitution=0.4, mu=0.5):
+    if box.inv_mass == 0: return None
+    ground_y = ground.pos.y
     vertices = box.get_vertices()
-    bottom_vertices = [v for v in vertices if v.y <= ground_y + 0.05]
-    if not bottom_vertices: return
-
-    normal = Vec2(0, 1)
+    bottom_vertices = [(k, v) for k, v in enumerate(vertices) if v.y <= ground_y + 0.05]
+    if not bottom_vertices: return None
 
-    # 1. Positional Correction First
+    # Vertices just above the ground are kept as speculative contacts
+    # (positive separation); the deepest one sets the position correction
+    contacts = [Contact(v, k, v.y - ground_y) for k, v in bottom_vertices]
     min_y = min(v.y for v in vertices)
-    if min_y < ground_y:
-        box.pos.y += (ground_y - min_y)
-
-    # 2. Impulse Resolution
-    for v in bottom_vertices:
-        r = v - box.pos
-        vel_at_contact = box.vel + r.perp() * box.ang_vel
-        vn = vel_at_contact.dot(normal)
-        jn = 0.0
-
-        if vn < 0:
-            r_cn = r.perp().dot(normal)
-            inv_mass_sum = box.inv_mass + r_cn ** 2 * box.inv_inertia
-            jn = -(1 + restitution) * vn / inv_mass_sum
-            # Divide impulse by contact count to avoid double-energy explosion
-            jn /= len(bottom_vertices)
-
-            impulse = normal * jn
-            box.vel += impulse * box.inv_mass
-            box.ang_vel += r.perp().dot(impulse) * box.inv_inertia
-
-        # Friction
-        vt_vec = vel_at_contact - normal * vn
-        if vt_vec.length() > 0.01:
-            t = vt_vec.normalized()
-            r_ct = r.perp().dot(t)
-            inv_mass_sum = box.inv_mass + r_ct ** 2 * box.inv_inertia
-            jt = -vel_at_contact.dot(t) / inv_mass_sum
-            jt = max(-mu * abs(jn), min(mu * abs(jn), jt))
-
-            f_impulse = t * jt
-            box.vel += f_impulse * box.inv_mass
-            box.ang_vel += r.perp().dot(f_impulse) * box.inv_inertia
+    return Manifold(ground, box, Vec2(0, 1), contacts, restitution, mu,
+                    penetration=ground_y - min_y)
 
 
-# -------------------------------
-# Box-box collision (REWRITTEN)
-# -------------------------------
-def resolve_box_box(a, b, restitution=0.3, mu=0.5, iterations=5):
-    # 1. Generate Manifold ONCE
-    result = sat_box_box(a, b)
-    if result is None:
-        return
-    normal, penetration = result
-
-    if penetration <= 0:
-        return
-
-    # 2. Apply Position Correction ONCE
-    inv_mass_sum = a.inv_mass + b.inv_mass
-    if inv_mass_sum == 0:
-        return
+def resolve_box_ground_contact(box, ground_y, restitution=0.4, mu=0.5):
+    resolve_manifold(box_ground_manifold(box, Ground(ground_y), restitution, mu))
 
-    correction_mag = penetration / inv_mass_sum * 0.8  # 80% correction
-    correction = normal * correction_mag
-    a.pos -= correction * a.inv_mass
-    b.pos += correction * b.inv_mass
 
-    # 3. Find Contact Points
-    verts_a = a.get_vertices()
-    verts_b = b.get_vertices()
-    contacts = [v for v in verts_a if point_inside_box(v, b)] + \
-               [v for v in verts_b if point_inside_box(v, a)]
-
-    # Fallback for perfect edge-edge alignment
+# -------------------------------
+# Polygon-polygon collision (boxes included)
+# -------------------------------
+def _clip(points, nx, ny, offset, tag):
+    # Sutherland-Hodgman step for a two-point segment: keep the part with
+    # n . p <= offset. A point created by the clip gets the plane's tag as
+    # its feature id.
+    (p1, f1), (p2, f2) = points
+    d1 = p1.x * nx + p1.y * ny - offset
+    d2 = p2.x * nx + p2.y * ny - offset
+    out = []
+    if d1 <= 0:
+        out.append((p1, f1))
+    if d2 <= 0:
+        out.append((p2, f2))
+    if d1 * d2 < 0:
+        out.append((p1 + (p2 - p1) * (d1 / (d1 - d2)), tag))
+    return out
+
+
+def polygon_manifold(a, b, restitution=0.3, mu=0.5):
+    if a.inv_mass + b.inv_mass == 0:
+        return None
+
+    # 1. SAT: the face of least penetration becomes the reference face.
+    # b's face only wins by a clear margin, so near-ties don't flip the
+    # reference (and the warm-start feature ids) between steps.
+    sep_a, edge_a = _max_separation(a, b)
+    if sep_a > 0:
+        return None
+    sep_b, edge_b = _max_separation(b, a)
+    if sep_b > 0:
+        return None
+    if sep_b > sep_a + 0.1 * CONTACT_SLOP:
+        ref, inc, edge, sep, flip = b, a, edge_b, sep_b, True
+    else:
+        ref, inc, edge, sep, flip = a, b, edge_a, sep_a, False
+
+    ref_verts = ref.get_vertices()
+    n = ref.get_axes()[edge]
+    v1 = ref_verts[edge]
+    v2 = ref_verts[(edge + 1) % len(ref_verts)]
+
+    # 2. Incident edge: the edge of the other shape most anti-parallel to n
+    inc_axes = inc.get_axes()
+    k = min(range(len(inc_axes)), key=lambda j: inc_axes[j].dot(n))
+    inc_verts = inc.get_vertices()
+    k2 = (k + 1) % len(inc_verts)
+    points = [(inc_verts[k], k), (inc_verts[k2], k2)]
+
+    # 3. Clip it to the side planes of the reference face
+    t = (v2 - v1).normalized()
+    points = _clip(points, -t.x, -t.y, -t.dot(v1), -1)
+    if len(points) < 2:
+        return None
+    points = _clip(points, t.x, t.y, t.dot(v2), -2)
+    if len(points) < 2:
+        return None
+
+    # 4. Keep points behind the reference face, or within CONTACT_SLOP of
+    # it so resting faces keep both points. Each contact sits midway
+    # between the incident point and the face. Feature ids: (reference
+    # side, reference edge, incident vertex or clip plane).
+    front = n.dot(v1)
+    contacts = []
+    for p, tag in points:
+        separation = n.dot(p) - front
+        if separation <= CONTACT_SLOP:
+            contacts.append(Contact(p - n * (separation * 0.5), (flip, edge, tag), separation))
     if not contacts:
-        contacts = [(a.pos + b.pos) * 0.5]
+        return None
 
-    num_contacts = len(contacts)
-    if num_contacts == 0: return
+    # 80% of the depth is removed by the position pass
+    normal = n * -1 if flip else n
+    return Manifold(a, b, normal, contacts, restitution, mu,
+                    penetration=-sep, correction=0.8)
 
-    # 4. Iteratively Solve Velocities
-    # We use a fixed tangent for boxes (surface slide), not velocity tangent
-    tangent = normal.perp()
 
-    for _ in range(iterations):
-        for contact in contacts:
-            ra = contact - a.pos
-            rb = contact - b.pos
+def box_box_manifold(a, b, restitution=0.3, mu=0.5):
+    return polygon_manifold(a, b, restitution, mu)
 
-            # Relative Velocity
-            va = a.vel + ra.perp() * a.ang_vel
-            vb = b.vel + rb.perp() * b.ang_vel
-            rv = vb - va
 
-            vel_along_normal = rv.dot(normal)
+def resolve_box_box(a, b, restitution=0.3, mu=0.5, iterations=5):
+    resolve_manifold(box_box_manifold(a, b, restitution, mu), iterations)
+
 
-            # Do not resolve if separating
-            if vel_along_normal > 0:
-                continue
+# -------------------------------
+# Circle-box collision
+# -------------------------------
+def circle_box_manifold(circle, box, restitution=0.4, mu=0.5):
+    if circle.inv_mass == 0 and box.inv_mass == 0:
+        return None
+
+    # Circle center in the box's local frame
+    c, s = box.get_rotation()
+    dx = circle.pos.x - box.pos.x
+    dy = circle.pos.y - box.pos.y
+    lx = dx * c + dy * s
+    ly = dy * c - dx * s
+    hw, hh = box.width / 2, box.height / 2
+    r = circle.radius
+    if abs(lx) > hw + r or abs(ly) > hh + r:
+        return None
+
+    # Closest point on the box (qx, qy) and the local normal towards the circle
+    qx = max(-hw, min(hw, lx))
+    qy = max(-hh, min(hh, ly))
+    if qx != lx or qy != ly:
+        ox, oy = lx - qx, ly - qy
+        dist = (ox * ox + oy * oy) ** 0.5
+        if dist > r:
+            return None
+        nx, ny = ox / dist, oy / dist
+        depth = r - dist
+    else:
+        # Center inside the box: push out through the nearest face
+        fx = hw - abs(lx)
+        fy = hh - abs(ly)
+        if fx < fy:
+            nx, ny = (1.0 if lx >= 0 else -1.0), 0.0
+            qx = nx * hw
+        else:
+            nx, ny = 0.0, (1.0 if ly >= 0 else -1.0)
+            qy = ny * hh
+        depth = r + min(fx, fy)
 
-            ra_cn = ra.perp().dot(normal)
-            rb_cn = rb.perp().dot(normal)
-            denom = a.inv_mass + b.inv_mass + ra_cn ** 2 * a.inv_inertia + rb_cn ** 2 * b.inv_inertia
+    # Back to world space; the manifold normal points from circle to box
+    point = Vec2(box.pos.x + c * qx - s * qy, box.pos.y + s * qx + c * qy)
+    normal = Vec2(-(c * nx - s * ny), -(s * nx + c * ny))
+    return Manifold(circle, box, normal, [Contact(point, 0, -depth)], restitution, mu,
+                    penetration=depth)
 
-            # Normal Impulse
-            j = -(1 + restitution) * vel_along_normal / denom
-            j /= num_contacts  # Distribute impulse across contacts
 
-            impulse = normal * j
+def resolve_circle_box(circle, box, restitution=0.4, mu=0.5):
+    resolve_manifold(circle_box_manifold(circle, box, restitution, mu))
 
-            a.vel -= impulse * a.inv_mass
-            a.ang_vel -= ra.perp().dot(impulse) * a.inv_inertia
-            b.vel += impulse * b.inv_mass
-            b.ang_vel += rb.perp().dot(impulse) * b.inv_inertia
 
-            # Friction Impulse
-            # Re-calculate relative velocity after normal push
-            va = a.vel + ra.perp() * a.ang_vel
-            vb = b.vel + rb.perp() * b.ang_vel
-            rv = vb - va
+# -------------------------------
+# Circle-polygon collision
+# -------------------------------
+def circle_polygon_manifold(circle, poly, restitution=0.4, mu=0.5):
+    if circle.inv_mass == 0 and poly.inv_mass == 0:
+        return None
+
+    # Face the circle center is farthest in front of
+    verts = poly.get_vertices()
+    axes = poly.get_axes()
+    c = circle.pos
+    r = circle.radius
+    best, edge = -float('inf'), 0
+    for i, n in enumerate(axes):
+        sep = n.dot(c - verts[i])
+        if sep > best:
+            best, edge = sep, i
+    if best > r:
+        return None
+
+    v1 = verts[edge]
+    v2 = verts[(edge + 1) % len(verts)]
+    n = axes[edge]
+    if best <= 0:
+        # Center inside: push out through that face
+        point = c - n * best
+        depth = r - best
+    else:
+        # Closest point is a vertex when the center is past either end of
+        # the face, otherwise the projection onto the face
+        if (c - v1).dot(v2 - v1) <= 0:
+            point = v1
+        elif (c - v2).dot(v1 - v2) <= 0:
+            point = v2
+        else:
+            point = c - n * best
+        d = c - point
+        dist = d.length()
+        if dist > r:
+            return None
+        if dist > 0:
+            n = d * (1 / dist)
+        depth = r - dist
 
-            vt = rv.dot(tangent)
-            ra_ct = ra.perp().dot(tangent)
-            rb_ct = rb.perp().dot(tangent)
-            denom_t = a.inv_mass + b.inv_mass + ra_ct ** 2 * a.inv_inertia + rb_ct ** 2 * b.inv_inertia
+    # The manifold normal points from circle to polygon
+    return Manifold(circle, poly, n * -1, [Contact(point, 0, -depth)], restitution, mu,
+                    penetration=depth)
 
-            jt = -vt / denom_t
-            jt /= num_contacts
 
-            # Clamp friction
-            max_jt = mu * abs(j)
-            jt = max(-max_jt, min(max_jt, jt))
+def resolve_circle_polygon(circle, poly, restitution=0.4, mu=0.5):
+    resolve_manifold(circle_polygon_manifold(circle, poly, restitution, mu))
 
-            f_impulse = tangent * jt
 
-            a.vel -= f_impulse * a.inv_mass
-            a.ang_vel -= ra.perp().dot(f_impulse) * a.inv_inertia
-            b.vel += f_impulse * b.inv_mass
-            b.ang_vel += rb.perp().dot(f_impulse) * b.inv_inertia
\ No newline at end of file
+# -------------------------------
+# Shape dispatch
+# -------------------------------
+def _swapped(builder):
+    def build(a, b, restitution, mu):
+        return builder(b, a, restitution, mu)
+    return build
+
+
+# (shape_type of a, shape_type of b) -> (manifold builder, world.materials
+# key). Pairs without an entry generate no contacts.
+PAIR_HANDLERS = {
+    (CIRCLE, CIRCLE): (circle_circle_manifold, "circle_circle"),
+    (BOX, BOX): (polygon_manifold, "box_box"),
+    (BOX, POLYGON): (polygon_manifold, "box_box"),
+    (POLYGON, BOX): (polygon_manifold, "box_box"),
+    (POLYGON, POLYGON): (polygon_manifold, "box_box"),
+    (CIRCLE, BOX): (circle_box_manifold, "circle_box"),
+    (BOX, CIRCLE): (_swapped(circle_box_manifold), "circle_box"),
+    (CIRCLE, POLYGON): (circle_polygon_manifold, "circle_box"),
+    (POLYGON, CIRCLE): (_swapped(circle_polygon_manifold), "circle_box"),
+}
+
+# shape_type -> (ground manifold builder, world.materials key)
+GROUND_HANDLERS = {
+    CIRCLE: (circle_ground_manifold, "circle_ground"),
+    BOX: (box_ground_manifold, "box_ground"),
+    POLYGON: (box_ground_manifold, "box_ground"),
+}
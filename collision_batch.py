@@ -0,0 +1,298 @@
+from operator import attrgetter
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the batched solvers
+    np = None
+
+from manifold import RESTITUTION_THRESHOLD
+
+
+# -------------------------------
+# Pair coloring
+# -------------------------------
+def color_pairs(pairs):
+    # Greedy edge coloring: no body appears twice within one color, so each
+    # color can be solved as one vectorized batch without scatter conflicts.
+    # Colors are assigned in pair order, which keeps the result deterministic.
+    used = {}
+    colors = []
+    for k, (i, j) in enumerate(pairs):
+        mask = used.get(i, 0) | used.get(j, 0)
+        c = (~mask & (mask + 1)).bit_length() - 1
+        used[i] = used.get(i, 0) | (1 << c)
+        used[j] = used.get(j, 0) | (1 << c)
+        if c == len(colors):
+            colors.append([])
+        colors[c].append(k)
+    return colors
+
+
+def _perp(v):
+    return np.stack((-v[:, 1], v[:, 0]), axis=1)
+
+
+def _dot(u, v):
+    return u[:, 0] * v[:, 0] + u[:, 1] * v[:, 1]
+
+
+def _rows(u, v):
+    # Row-wise dot product of two (n, 3) arrays
+    return u[:, 0] * v[:, 0] + u[:, 1] * v[:, 1] + u[:, 2] * v[:, 2]
+
+
+# -------------------------------
+# Circle-circle batch
+# -------------------------------
+# Everything a batch reads from a body, in one C-level getter call
+_BODY_ROW = attrgetter("pos.x", "pos.y", "vel.x", "vel.y", "ang_vel", "inv_mass", "inv_inertia", "radius")
+
+
+class CircleBatchSolver:
+    # Circle-circle contacts as arrays, following the same stages as the
+    # scalar manifolds: prepare() detects contacts once per substep,
+    # warm_start() re-applies the impulses carried over from the last
+    # substep, solve() runs one sequential-impulse sweep per color,
+    # finish() hands the velocities back for the angular clamp, and
+    # correct_positions() does the end-of-substep position pass.
+    #
+    # prepare() gathers the bodies into scratch arrays once per substep and
+    # the arrays stay authoritative until the substep ends. Only bodies that
+    # scalar manifolds or constraints also touch (see share()) are synced
+    # around each stage, so a pile resting on the ground only moves its
+    # bottom row back and forth.
+    def __init__(self, restitution=0.6, mu=0.5):
+        if np is None:
+            raise ImportError("CircleBatchSolver requires numpy")
+        self.restitution = restitution
+        self.mu = mu
+        self.colors = []
+        self.involved = []  # world index of each scratch row
+        self.group = []     # the bodies of those rows
+        self.touched = []   # rows in at least one touching pair
+        self.shared = []    # rows also touched by the scalar solver
+        # Touching pairs of the last prepare() as i * body_count + j (world
+        # indices), for carrying impulses over; None when there were none
+        self.keys = None
+        self.body_count = 0
+
+    # -------------------------------
+    # Body data
+    # -------------------------------
+    def _pull(self, rows, fields):
+        # Bodies -> scratch rows. fields: "vel" and/or "pos"
+        if not rows:
+            return
+        group = self.group
+        bodies = [group[k] for k in rows]
+        if "vel" in fields:
+            self.vel[rows] = [(b.vel.x, b.vel.y, b.ang_vel) for b in bodies]
+        if "pos" in fields:
+            self.pos[rows] = [(b.pos.x, b.pos.y) for b in bodies]
+
+    def _push(self, rows, fields):
+        # Scratch rows -> bodies
+        group = self.group
+        if "vel" in fields:
+            for k, (vx, vy, w) in zip(rows, self.vel[rows].tolist()):
+                b = group[k]
+                b.vel.x, b.vel.y = vx, vy
+                b.ang_vel = w
+        if "pos" in fields:
+            for k, (x, y) in zip(rows, self.pos[rows].tolist()):
+                b = group[k]
+                b.pos.x, b.pos.y = x, y
+
+    # -------------------------------
+    # Stages
+    # -------------------------------
+    def prepare(self, bodies, pairs, warm=True):
+        # warm: start pairs that were already touching from their impulses
+        # of the last substep, like ManifoldCache does for scalar manifolds
+        previous = None
+        if warm and self.keys is not None and self.body_count == len(bodies):
+            previous = self.keys, self.n, self.jn, self.jt
+        self.colors = []
+        self.keys = None
+        if not pairs:
+            return
+
+        # Compact rows for the bodies of the candidate pairs
+        involved, local = np.unique(np.array(pairs, dtype=np.intp), return_inverse=True)
+        local = local.reshape(-1, 2)
+        self.involved = involved.tolist()
+        self.group = [bodies[k] for k in self.involved]
+        state = np.array(list(map(_BODY_ROW, self.group)))
+        # vel rows are (vx, vy, ang_vel), so one gather covers a body's velocity
+        self.pos, self.vel = state[:, 0:2].copy(), state[:, 2:5].copy()
+        inv_mass, inv_inertia, radius = state[:, 5].copy(), state[:, 6], state[:, 7]
+        self.inv_mass = inv_mass
+        pos, vel = self.pos, self.vel
+
+        ia, ib = local[:, 0], local[:, 1]
+
+        # Narrowphase for every candidate pair at once
+        delta = pos[ib] - pos[ia]
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        min_dist = radius[ia] + radius[ib]
+        hit = np.flatnonzero((dist > 0) & (dist <= min_dist))
+        if len(hit) == 0:
+            return
+
+        # Contacts are stored color by color, so each color is a slice
+        colors = color_pairs(list(zip(ia[hit].tolist(), ib[hit].tolist())))
+        hit = hit[np.concatenate([np.array(c, dtype=np.intp) for c in colors])]
+        ends = np.cumsum([len(c) for c in colors]).tolist()
+        self.colors = [slice(start, end) for start, end in zip([0] + ends, ends)]
+
+        ia, ib = ia[hit], ib[hit]
+        delta, dist, min_dist = delta[hit], dist[hit], min_dist[hit]
+        n = delta / dist[:, None]
+        t = _perp(n)
+        ra = n * radius[ia][:, None]
+        rb = ra - delta
+
+        im_a, im_b = inv_mass[ia], inv_mass[ib]
+        ii_a, ii_b = inv_inertia[ia], inv_inertia[ib]
+        rn_a, rn_b = _dot(_perp(ra), n), _dot(_perp(rb), n)
+        rt_a, rt_b = _dot(_perp(ra), t), _dot(_perp(rb), t)
+        k_n = im_a + im_b + rn_a ** 2 * ii_a + rn_b ** 2 * ii_b
+        k_t = im_a + im_b + rt_a ** 2 * ii_a + rt_b ** 2 * ii_b
+
+        # Per contact and direction: the row that projects a body's
+        # (vx, vy, ang_vel) on it, and the velocity change of a unit impulse
+        scale_a = np.column_stack((im_a, im_a, ii_a))
+        scale_b = np.column_stack((im_b, im_b, ii_b))
+        self.n_a, self.n_b = np.column_stack((n, rn_a)), np.column_stack((n, rn_b))
+        self.t_a, self.t_b = np.column_stack((t, rt_a)), np.column_stack((t, rt_b))
+        self.dn_a, self.dn_b = self.n_a * scale_a, self.n_b * scale_b
+        self.dt_a, self.dt_b = self.t_a * scale_a, self.t_b * scale_b
+
+        vn = _rows(vel[ib], self.n_b) - _rows(vel[ia], self.n_a)
+
+        self.ia, self.ib = ia, ib
+        self.n = n
+        self.mass_n = 1.0 / k_n
+        self.mass_t = 1.0 / k_t
+        self.bias = np.where(vn < -RESTITUTION_THRESHOLD, -self.restitution * vn, 0.0)
+        self.penetration = min_dist - dist
+        self.jn = np.zeros(len(ia))
+        self.jt = np.zeros(len(ia))
+        self.keys = involved[ia] * len(bodies) + involved[ib]
+        self.body_count = len(bodies)
+        if previous is not None:
+            self._carry(*previous)
+        # Rows the stages write; the rest of the gathered rows never change
+        self.touched = np.unique(np.concatenate((ia, ib))).tolist()
+        self.shared = []
+
+    def share(self, *links):
+        # links: lists of manifolds / constraints solved by the scalar code
+        # in the same substep. Their bodies are synced around every stage.
+        if not self.colors:
+            return
+        row = {id(self.group[k]): k for k in self.touched}
+        shared = {row.get(id(body)) for group in links for c in group for body in (c.a, c.b)}
+        shared.discard(None)
+        self.shared = sorted(shared)
+
+    def _carry(self, keys, n, jn, jt):
+        # Same pair along a similar normal (the test Manifold.warm_from uses)
+        order = np.argsort(keys)
+        found = np.minimum(np.searchsorted(keys, self.keys, sorter=order), len(keys) - 1)
+        old = order[found]
+        match = np.flatnonzero((keys[old] == self.keys) & (_dot(n[old], self.n) >= 0.95))
+        self.jn[match] = jn[old[match]]
+        self.jt[match] = jt[old[match]]
+
+    def impulses(self):
+        # Accumulated impulses of the touching pairs, for World.snapshot()
+        if self.keys is None:
+            return None
+        return self.body_count, self.keys.copy(), self.n.copy(), self.jn.copy(), self.jt.copy()
+
+    def set_impulses(self, state):
+        # Inverse of impulses(): the next prepare() warm-starts from `state`
+        self.colors = []
+        if state is None:
+            self.keys = None
+            return
+        self.body_count, keys, n, jn, jt = state
+        self.keys, self.n, self.jn, self.jt = keys.copy(), n.copy(), jn.copy(), jt.copy()
+
+    def touching(self):
+        # World indices of the pairs found in contact by prepare()
+        if not self.colors:
+            return []
+        return [(self.involved[i], self.involved[j]) for i, j in zip(self.ia.tolist(), self.ib.tolist())]
+
+    def warm_start(self):
+        # Re-apply the carried impulses. Bodies can be in several pairs, so
+        # the impulses are scatter-added in pair order.
+        if not self.colors or not (self.jn.any() or self.jt.any()):
+            return
+        self._pull(self.shared, ("vel",))
+        jn, jt = self.jn[:, None], self.jt[:, None]
+        np.subtract.at(self.vel, self.ia, jn * self.dn_a + jt * self.dt_a)
+        np.add.at(self.vel, self.ib, jn * self.dn_b + jt * self.dt_b)
+        self._push(self.shared, ("vel",))
+
+    def solve(self):
+        # Returns the largest impulse change, like Manifold.solve
+        if not self.colors:
+            return 0.0
+        largest = 0.0
+        self._pull(self.shared, ("vel",))
+        vel = self.vel
+
+        for c in self.colors:
+            ia, ib = self.ia[c], self.ib[c]
+            va, vb = vel[ia], vel[ib]
+
+            # Normal impulse, clamped on the accumulated total
+            jn0 = self.jn[c]
+            vn = _rows(vb, self.n_b[c]) - _rows(va, self.n_a[c])
+            jn = np.maximum(jn0 + self.mass_n[c] * (self.bias[c] - vn), 0.0)
+            djn = jn - jn0
+            self.jn[c] = jn
+            va -= djn[:, None] * self.dn_a[c]
+            vb += djn[:, None] * self.dn_b[c]
+
+            # Friction impulse, bounded by the accumulated normal impulse
+            jt0 = self.jt[c]
+            vt = _rows(vb, self.t_b[c]) - _rows(va, self.t_a[c])
+            max_jt = self.mu * jn
+            jt = np.clip(jt0 - vt * self.mass_t[c], -max_jt, max_jt)
+            djt = jt - jt0
+            self.jt[c] = jt
+            va -= djt[:, None] * self.dt_a[c]
+            vb += djt[:, None] * self.dt_b[c]
+
+            # No body appears twice within a color, so plain stores suffice
+            vel[ia] = va
+            vel[ib] = vb
+            largest = max(largest, float(np.abs(djn).max()), float(np.abs(djt).max()))
+
+        self._push(self.shared, ("vel",))
+        return largest
+
+    def finish(self):
+        # After the last solve(): every velocity back to its body
+        if self.colors:
+            self._push(self.touched, ("vel",))
+
+    def correct_positions(self):
+        if not self.colors:
+            return
+        self._pull(self.shared, ("pos",))
+        pos, inv_mass = self.pos, self.inv_mass
+
+        # Corrections come from the depths measured in prepare(), so they are
+        # independent and can be summed in one deterministic scatter
+        ia, ib = self.ia, self.ib
+        im_a, im_b = inv_mass[ia], inv_mass[ib]
+        corr = self.n * (self.penetration / (im_a + im_b))[:, None]
+        np.add.at(pos, ia, -corr * im_a[:, None])
+        np.add.at(pos, ib, corr * im_b[:, None])
+
+        self._push(self.touched, ("pos",))
@@ -0,0 +1,168 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the batched solvers
+    np = None
+
+from collision_batch import color_pairs
+from constraints import DistanceJoint, RopeConstraint
+
+# Constraint types the batch solves; anything else keeps its own solve()
+BATCHED_TYPES = (RopeConstraint, DistanceJoint)
+
+
+# -------------------------------
+# Rope / distance joint batch
+# -------------------------------
+class ConstraintBatchSolver:
+    # RopeConstraints and DistanceJoints as arrays. The constraint graph is
+    # colored so no body appears twice within a color, which makes each color
+    # one vectorized position correction with the same math as the scalar
+    # solve(). prepare() runs once per substep, solve() once per solver
+    # iteration, finish() writes positions, velocities and broken flags back.
+    #
+    # Colors are swept forward on even iterations and backward on odd ones:
+    # a one-way sweep over a colored chain only moves a correction a couple
+    # of links per iteration, the alternating sweep carries it both ways.
+    #
+    # Unlike the scalar loop, finish() also turns each body's total
+    # correction into a velocity change (as in position-based dynamics).
+    # Without it a hanging chain keeps gaining downward speed that the
+    # corrections have to undo every substep, and long chains stretch.
+    #
+    # The bodies involved are gathered into a scratch array in prepare() and
+    # written back in finish().
+    def __init__(self):
+        if np is None:
+            raise ImportError("ConstraintBatchSolver requires numpy")
+        self.constraints = []  # batched constraints, in array order
+        self.others = []       # constraints left to the scalar loop
+        self.colors = []
+        self.involved = []
+        self.pos = None
+        self.write_through = False
+        self.sweeps = 0
+        self._source = None
+
+    # -------------------------------
+    # Body data
+    # -------------------------------
+    def _gather(self):
+        self.pos = np.array([(b.pos.x, b.pos.y) for b in self.involved])
+
+    def _scatter(self):
+        for b, p in zip(self.involved, self.pos.tolist()):
+            b.pos.x, b.pos.y = p
+
+    # -------------------------------
+    # Stages
+    # -------------------------------
+    def _build(self, constraints):
+        # Split off the batched constraints, index their bodies and color
+        # the graph. Cached while the constraint list stays the same.
+        self.constraints, self.others = [], []
+        for c in constraints:
+            if type(c) in BATCHED_TYPES:
+                if not getattr(c, "broken", False):
+                    self.constraints.append(c)
+            else:
+                self.others.append(c)
+        self.colors = []
+        self.write_through = False
+        batched = self.constraints
+        if not batched:
+            return
+
+        # Compact local indices for the gathered positions
+        local = {}
+        for c in batched:
+            for body in (c.a, c.b):
+                if body not in local:
+                    local[body] = len(local)
+        self.involved = list(local)
+        pairs = [(local[c.a], local[c.b]) for c in batched]
+        # Scalar constraints on the same bodies need the scratch array
+        # synced around every sweep
+        self.write_through = any(getattr(c, "a", None) in local or getattr(c, "b", None) in local
+                                 for c in self.others)
+
+        self.ia = np.array([i for i, _ in pairs], dtype=np.intp)
+        self.ib = np.array([j for _, j in pairs], dtype=np.intp)
+        self.rope = np.array([type(c) is RopeConstraint for c in batched])
+        self.threshold = np.array([c.break_threshold if rope and c.break_threshold is not None
+                                   else np.inf for c, rope in zip(batched, self.rope.tolist())])
+
+        im_a = np.array([c.a.inv_mass for c in batched], dtype=float)
+        im_b = np.array([c.b.inv_mass for c in batched], dtype=float)
+        inv_mass_sum = im_a + im_b
+        self.movable = inv_mass_sum > 0
+        safe = np.where(self.movable, inv_mass_sum, 1.0)
+        self.share_a = np.where(self.movable, im_a / safe, 0.0)[:, None]
+        self.share_b = np.where(self.movable, im_b / safe, 0.0)[:, None]
+
+        self.colors = [np.array(c, dtype=np.intp) for c in color_pairs(pairs)]
+
+    def prepare(self, constraints, dt):
+        if constraints != self._source:
+            self._build(constraints)
+            self._source = list(constraints)
+        self.sweeps = 0
+        if not self.colors:
+            return
+
+        # Lengths and stiffness may be edited between steps (winches etc.)
+        batched = self.constraints
+        self.length = np.array([c.length for c in batched], dtype=float)
+        self.stiffness = np.array([1.0 if rope else c.stiffness
+                                   for c, rope in zip(batched, self.rope.tolist())])
+        self.broken = np.zeros(len(batched), dtype=bool)
+        self.dt = dt
+        self._gather()
+        self.start = self.pos.copy()
+
+    def solve(self):
+        # One sweep over the colors. Returns the largest correction, like
+        # Constraint.solve
+        if not self.colors:
+            return 0.0
+        if self.write_through:
+            self._gather()
+        pos = self.pos
+        colors = self.colors if self.sweeps % 2 == 0 else self.colors[::-1]
+        self.sweeps += 1
+
+        largest = 0.0
+        for c in colors:
+            ia, ib = self.ia[c], self.ib[c]
+            delta = pos[ib] - pos[ia]
+            dist = np.hypot(delta[:, 0], delta[:, 1])
+            error = dist - self.length[c]
+
+            # Ropes only pull, and snap once stretched past their threshold
+            live = ~self.broken[c] & (dist > 0) & (~self.rope[c] | (error > 0))
+            snapped = live & (error > self.threshold[c])
+            if snapped.any():
+                self.broken[c[snapped]] = True
+                live &= ~snapped
+
+            corr = np.where(live & self.movable[c], error * self.stiffness[c], 0.0)
+            shift = delta * (corr / np.where(dist > 0, dist, 1.0))[:, None]
+            pos[ia] += shift * self.share_a[c]
+            pos[ib] -= shift * self.share_b[c]
+            largest = max(largest, float(np.abs(corr).max()))
+
+        if self.write_through:
+            self._scatter()
+        return largest
+
+    def finish(self):
+        if not self.colors:
+            return
+        if self.write_through:
+            self._gather()
+        moved = (self.pos - self.start) / self.dt
+        self._scatter()
+        for b, (dx, dy) in zip(self.involved, moved.tolist()):
+            b.vel.x += dx
+            b.vel.y += dy
+        for k in np.flatnonzero(self.broken).tolist():
+            self.constraints[k].broken = True
@@ -1,12 +1,19 @@
-import pygame
+import math
+
+from vector import Vec2
+
+# Drawing lives in render.py; the draw methods below import it on first
+# use, so headless code never pays for pygame.
 
 
 class Constraint:
     def pre_solve(self, dt):
         pass
 
+    # Returns the size of the position correction applied (0.0 when none);
+    # World's adaptive mode stops iterating once every correction is small
     def solve(self):
-        pass
+        return 0.0
 
 
 class RopeConstraint(Constraint):
@@ -19,41 +26,41 @@ class RopeConstraint(Constraint):
 
     def solve(self):
         if self.broken:
-            return
+            return 0.0
 
         delta = self.b.pos - self.a.pos
         dist = delta.length()
         if dist <= self.length:
-            return
+            return 0.0
 
         stretch = dist - self.length
 
         # break condition
         if self.break_threshold is not None and stretch > self.break_threshold:
             self.broken = True
-            return
+            return 0.0
 
         if dist == 0:
-            return
-
-        n = delta * (1 / dist)
+            return 0.0
 
         inv_mass_sum = self.a.inv_mass + self.b.inv_mass
         if inv_mass_sum == 0:
-            return
+            return 0.0
 
+        # delta is a fresh vector, so it becomes the shift in place
         corr = stretch
-        self.a.pos += n * corr * (self.a.inv_mass / inv_mass_sum)
-        self.b.pos -= n * corr * (self.b.inv_mass / inv_mass_sum)
-
-    def draw(self, screen, world_to_screen):
+        shift = delta
+        shift *= 1 / dist
+        shift *= corr
+        self.a.pos.add_scaled(shift, self.a.inv_mass / inv_mass_sum)
+        self.b.pos.add_scaled(shift, -(self.b.inv_mass / inv_mass_sum))
+        return corr
+
+    def draw(self, screen, world_to_screen, pose=None):
         if self.broken:
-            return
-
-        p1 = world_to_screen(self.a.pos)
-        p2 = world_to_screen(self.b.pos)
-
-        pygame.draw.line(screen, (255, 0, 0), p1, p2, 2)
+            return None
+        from render import draw_link
+        return draw_link(screen, world_to_screen, self.a, self.b, (255, 0, 0), pose=pose)
 
 
 class DistanceJoint(Constraint):
@@ -67,24 +74,25 @@ class DistanceJoint(Constraint):
         delta = self.b.pos - self.a.pos
         dist = delta.length()
         if dist == 0:
-            return
+            return 0.0
 
         error = dist - self.length
-        n = delta * (1 / dist)
 
         inv_mass_sum = self.a.inv_mass + self.b.inv_mass
         if inv_mass_sum == 0:
-            return
+            return 0.0
 
-        correction = n * (error * self.stiffness / inv_mass_sum)
-        self.a.pos += correction * self.a.inv_mass
-        self.b.pos -= correction * self.b.inv_mass
+        # delta is a fresh vector, so it becomes the correction in place
+        correction = delta
+        correction *= 1 / dist
+        correction *= error * self.stiffness / inv_mass_sum
+        self.a.pos.add_scaled(correction, self.a.inv_mass)
+        self.b.pos.add_scaled(correction, -self.b.inv_mass)
+        return abs(error * self.stiffness)
 
-    def draw(self, screen, world_to_screen):
-        p1 = world_to_screen(self.a.pos)
-        p2 = world_to_screen(self.b.pos)
-
-        pygame.draw.line(screen, (255, 200, 50), p1, p2, 2)
+    def draw(self, screen, world_to_screen, pose=None):
+        from render import draw_link
+        return draw_link(screen, world_to_screen, self.a, self.b, (255, 200, 50), pose=pose)
 
 
 class Spring:
@@ -96,22 +104,25 @@ class Spring:
         self.rest = rest
 
     def apply(self):
-        d = self.b.pos - self.a.pos
-        l = d.length()
-        if l == 0:
+        # One square root per spring; SpringNetwork repeats exactly these
+        # operations, so both give identical forces
+        a, b = self.a, self.b
+        dx = b.pos.x - a.pos.x
+        dy = b.pos.y - a.pos.y
+        l = math.sqrt(dx * dx + dy * dy)
+        if l <= 1e-8:
             return
 
-        n = d.normalized()
-        vrel = (self.b.vel - self.a.vel).dot(n)
+        inv = 1 / l
+        nx, ny = dx * inv, dy * inv
+        vrel = (b.vel.x - a.vel.x) * nx + (b.vel.y - a.vel.y) * ny
 
         f = -self.k * (l - self.rest) - self.c * vrel
-        force = n * f
-
-        self.a.apply_force(-force)
-        self.b.apply_force(force)
+        force = Vec2(nx * f, ny * f)
 
-    def draw_spring(self, screen, world_to_screen, spring, color=(200, 200, 200), width=2):
-        p0 = world_to_screen(spring.a.pos)
-        p1 = world_to_screen(spring.b.pos)
+        a.apply_force(-force)
+        b.apply_force(force)
 
-        pygame.draw.line(screen, color, p0, p1, width)
+    def draw_spring(self, screen, world_to_screen, spring, color=(200, 200, 200), width=2, pose=None):
+        from render import draw_link
+        return draw_link(screen, world_to_screen, spring.a, spring.b, color, width, pose)
@@ -1,18 +1,83 @@
 from vector import Vec2
 import math
 
-def rotate(vec,angle):
-    c,s=math.cos(angle),math.sin(angle)
-    return Vec2(c*vec.x-s*vec.y,s*vec.x+c*vec.y)
-
 def box_vertices(body):
-    hw,hh=body.width/2,body.height/2
-    local=[Vec2(-hw, -hh),Vec2(hw, -hh),Vec2(hw, hh),Vec2(-hw, hh)]
-    return [body.pos +rotate(v,body.angle) for v in local]
-
-def box_axes(vertices):
-    axes=[]
-    for i in range(len(vertices)):
-        edge=vertices[(i+1)%4]-vertices[i]
-        axes.append(edge.perp().normalized())
-    return axes
\ No newline at end of file
+    # World vertices of a box or polygon, from the body's transform cache
+    return list(body.get_vertices())
+
+def box_local_vertices(width, height):
+    hw, hh = width / 2, height / 2
+    return [(-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh)]
+
+
+def transform_vertices(local, x, y, c, s):
+    # local (lx, ly) tuples -> world Vec2s, for a precomputed cos/sin
+    return [Vec2(x + c * lx - s * ly, y + s * lx + c * ly) for lx, ly in local]
+
+
+# -------------------------------
+# Convex polygons
+# -------------------------------
+# Local geometry is a list of (x, y) tuples, counter-clockwise, with edge i
+# running from vertex i to vertex i + 1.
+
+def polygon_normals(local):
+    # Outward unit normal of every edge
+    normals = []
+    n = len(local)
+    for i in range(n):
+        (x1, y1), (x2, y2) = local[i], local[(i + 1) % n]
+        ex, ey = x2 - x1, y2 - y1
+        length = math.hypot(ex, ey)
+        normals.append((ey / length, -ex / length))
+    return normals
+
+
+def polygon_properties(points):
+    # Validates a convex polygon and returns (local, area, centroid,
+    # unit_inertia): the vertices counter-clockwise about the centroid, and
+    # the moment of inertia about the centroid per unit mass
+    points = [(float(x), float(y)) for x, y in points]
+    n = len(points)
+    if n < 3:
+        raise ValueError("a polygon needs at least 3 vertices")
+    for i in range(n):
+        if points[i] == points[(i + 1) % n]:
+            raise ValueError("polygon has a repeated vertex")
+
+    twice_area = sum(points[i][0] * points[(i + 1) % n][1] - points[(i + 1) % n][0] * points[i][1]
+                     for i in range(n))
+    if twice_area < 0:
+        points.reverse()
+        twice_area = -twice_area
+    if twice_area == 0:
+        raise ValueError("polygon has zero area")
+
+    for i in range(n):
+        (x1, y1), (x2, y2), (x3, y3) = points[i], points[(i + 1) % n], points[(i + 2) % n]
+        turn = (x2 - x1) * (y3 - y2) - (y2 - y1) * (x3 - x2)
+        if turn < 0:
+            raise ValueError("polygon must be convex")
+        if turn == 0:
+            # A straight-through vertex would add a zero-length feature
+            raise ValueError("polygon has collinear vertices")
+
+    # Centroid from the triangle fan around the first vertex
+    ox, oy = points[0]
+    area = cx = cy = 0.0
+    for i in range(1, n - 1):
+        (x1, y1), (x2, y2) = points[i], points[i + 1]
+        tri = 0.5 * ((x1 - ox) * (y2 - oy) - (x2 - ox) * (y1 - oy))
+        area += tri
+        cx += tri * (ox + x1 + x2) / 3
+        cy += tri * (oy + y1 + y2) / 3
+    cx /= area
+    cy /= area
+
+    local = [(x - cx, y - cy) for x, y in points]
+    inertia = 0.0
+    for i in range(n):
+        (x1, y1), (x2, y2) = local[i], local[(i + 1) % n]
+        d = x1 * y2 - x2 * y1
+        inertia += d * (x1 * x1 + x1 * x2 + x2 * x2 + y1 * y1 + y1 * y2 + y2 * y2) / 12
+    return local, area, (cx, cy), inertia / area
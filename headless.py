@@ -0,0 +1,163 @@
+import itertools
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from snapshot import WorldSnapshot
+from world import World
+
+
+# -------------------------------
+# Headless batched runs
+# -------------------------------
+# Steps many independent worlds as fast as possible, without pygame.
+# A scene is a build(world, **params) function; with workers > 1 it runs in
+# a process pool, so build and metrics must be module-level functions.
+#
+#   def scene(world, k, c):
+#       ...
+#       world.springs.append(Spring(anchor, box, k=k, c=c, rest=2.0))
+#
+#   results = run_batch(scene, grid(k=[10, 20, 40], c=[0.5, 2.0]),
+#                       frames=600, workers=4)
+
+
+def grid(**axes):
+    # Cartesian product of parameter values: grid(k=[1, 2], c=[0.5]) ->
+    # [{"k": 1, "c": 0.5}, {"k": 2, "c": 0.5}]
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def state_summary(world):
+    # (x, y, angle) of every body
+    return [(b.pos.x, b.pos.y, b.angle) for b in world.bodies]
+
+
+def summary(world):
+    # Default end-of-run metrics
+    dynamic = [b for b in world.bodies if b.inv_mass != 0]
+    kinetic = 0.0
+    max_speed = 0.0
+    for b in dynamic:
+        speed = b.vel.length()
+        inertia = 1.0 / b.inv_inertia if b.inv_inertia else 0.0
+        kinetic += 0.5 * b.mass * speed ** 2 + 0.5 * inertia * b.ang_vel ** 2
+        max_speed = max(max_speed, speed)
+
+    mass = sum(b.mass for b in dynamic)
+    com = (sum(b.pos.x * b.mass for b in dynamic) / mass,
+           sum(b.pos.y * b.mass for b in dynamic) / mass) if mass else (0.0, 0.0)
+
+    return {
+        "kinetic_energy": kinetic,
+        "max_speed": max_speed,
+        "center_of_mass": com,
+        "min_y": min((b.pos.y for b in dynamic), default=0.0),
+        "max_y": max((b.pos.y for b in dynamic), default=0.0),
+        "constraints": len(world.constraints),
+        "finite": all(math.isfinite(b.pos.x) and math.isfinite(b.pos.y) for b in world.bodies),
+    }
+
+
+def run_world(build, params=None, frames=600, dt=1 / 60, record_every=0,
+              metrics=summary, world_kwargs=None):
+    # One world: build, step `frames` times, report. record_every=k keeps a
+    # state_summary() every k frames under "trajectory".
+    params = params or {}
+    world = World(**(world_kwargs or {}))
+    build(world, **params)
+    return _simulate(world, params, frames, dt, record_every, metrics)
+
+
+def _simulate(world, params, frames, dt, record_every, metrics):
+    trajectory = []
+    for frame in range(1, frames + 1):
+        world.step(dt)
+        if record_every and frame % record_every == 0:
+            trajectory.append(state_summary(world))
+
+    result = {"params": params, "metrics": metrics(world) if metrics else None}
+    if record_every:
+        result["trajectory"] = trajectory
+    return result
+
+
+def _run_job(job):
+    return run_world(*job)
+
+
+def run_batch(build, param_sets, frames=600, dt=1 / 60, workers=None, record_every=0,
+              metrics=summary, world_kwargs=None):
+    # One result per parameter set, in input order. workers=None or 1 runs
+    # in this process; more spreads worlds across a process pool.
+    jobs = [(build, params, frames, dt, record_every, metrics, world_kwargs)
+            for params in param_sets]
+    if not workers or workers <= 1 or len(jobs) <= 1:
+        return [_run_job(job) for job in jobs]
+
+    # Several worlds per task keeps pickling overhead low for short runs
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_job, jobs, chunksize=chunksize))
+
+
+# -------------------------------
+# Branching from a checkpoint
+# -------------------------------
+# What-if runs that all start from one saved state instead of a build
+# function: each branch forks the checkpoint, applies its change and steps.
+#
+#   checkpoint = world.snapshot()        # e.g. just before the collapse
+#   def gravity(world, g):
+#       world.gravity.y = g
+#   results = run_branches(checkpoint, gravity, grid(g=[-9.81, -5.0]), frames=300)
+
+_checkpoint = None  # the WorldSnapshot branches start from, per worker process
+
+
+def _set_checkpoint(checkpoint):
+    global _checkpoint
+    if not isinstance(checkpoint, WorldSnapshot):
+        checkpoint = WorldSnapshot.from_bytes(checkpoint)
+    _checkpoint = checkpoint
+
+
+def run_branch(checkpoint, variant=None, params=None, frames=600, dt=1 / 60, record_every=0,
+               metrics=summary):
+    # One branch: fork the checkpoint, variant(world, **params), step, report
+    params = params or {}
+    world = checkpoint.fork()
+    if variant is not None:
+        variant(world, **params)
+    return _simulate(world, params, frames, dt, record_every, metrics)
+
+
+def _run_branch_job(job):
+    return run_branch(_checkpoint, *job)
+
+
+def run_branches(checkpoint, variant, param_sets, frames=600, dt=1 / 60, workers=None,
+                 record_every=0, metrics=summary):
+    # checkpoint: a World (its current state is used), a WorldSnapshot or
+    # the bytes from to_bytes(). With workers > 1 and the "fork" start
+    # method (Linux), workers inherit the checkpoint copy-on-write from this
+    # process, so nothing is serialized per branch but the parameters;
+    # elsewhere each worker gets the snapshot bytes once.
+    if isinstance(checkpoint, World):
+        checkpoint = checkpoint.snapshot()
+    elif not isinstance(checkpoint, WorldSnapshot):
+        checkpoint = WorldSnapshot.from_bytes(checkpoint)
+
+    jobs = [(variant, params, frames, dt, record_every, metrics) for params in param_sets]
+    if not workers or workers <= 1 or len(jobs) <= 1:
+        return [run_branch(checkpoint, *job) for job in jobs]
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context, initargs = multiprocessing.get_context("fork"), (checkpoint,)
+    else:
+        context, initargs = None, (checkpoint.to_bytes(),)
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_set_checkpoint, initargs=initargs) as pool:
+        return list(pool.map(_run_branch_job, jobs, chunksize=chunksize))
@@ -0,0 +1,57 @@
+class Island:
+    # Dynamic bodies connected through contacts, constraints or springs,
+    # plus the links that connect them. Static bodies and the ground never
+    # join islands, so two piles resting on the same floor stay separate.
+    def __init__(self):
+        self.bodies = []
+        self.manifolds = []
+        self.constraints = []
+        self.springs = []
+
+    def is_awake(self):
+        return any(b.awake for b in self.bodies)
+
+
+def build_islands(bodies, manifolds=(), constraints=(), springs=()):
+    # Union-find over world.bodies. Islands come out ordered by their first
+    # body, and keep world order inside, so the result is deterministic.
+    index = {b: k for k, b in enumerate(bodies) if b.inv_mass != 0}
+    parent = list(range(len(bodies)))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    def link(a, b):
+        ka = index.get(a)
+        kb = index.get(b)
+        if ka is not None and kb is not None:
+            ra, rb = find(ka), find(kb)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+        return ka if ka is not None else kb
+
+    constraints = [c for c in constraints if not getattr(c, "broken", False)]
+    links = ([(m, "manifolds") for m in manifolds] +
+             [(c, "constraints") for c in constraints] +
+             [(s, "springs") for s in springs])
+    owners = [(obj, kind, link(obj.a, obj.b)) for obj, kind in links]
+
+    islands = {}
+    for k, b in enumerate(bodies):
+        if b.inv_mass == 0:
+            continue
+        root = find(k)
+        island = islands.get(root)
+        if island is None:
+            island = islands[root] = Island()
+        island.bodies.append(b)
+
+    # Links touching only static bodies belong to no island
+    for obj, kind, k in owners:
+        if k is not None:
+            getattr(islands[find(k)], kind).append(obj)
+
+    return list(islands.values())
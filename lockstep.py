@@ -0,0 +1,144 @@
+import hashlib
+from array import array
+
+# -------------------------------
+# State hashing
+# -------------------------------
+# With world.deterministic = True, World.step orders its work canonically
+# (pairs sorted by body index, constraints and springs sorted by the
+# indices of their bodies, a fixed iteration count) and chains a hash of
+# every body's position, angle and velocities into world.state_hash after
+# each step. Two worlds with the same bodies in the same order and the same
+# settings then hash identically step for step, whichever broadphase,
+# parallel mode or body store they use, so comparing 8-byte hashes is
+# enough to check a lockstep peer or an alternative code path.
+
+DIGEST_SIZE = 8
+
+
+def state_bytes(world):
+    # x, y, angle, vx, vy, ang_vel per body, as packed float64s
+    values = []
+    extend = values.extend
+    for b in world.bodies:
+        pos, vel = b.pos, b.vel
+        extend((pos.x, pos.y, b.angle, vel.x, vel.y, b.ang_vel))
+    return array("d", values).tobytes()
+
+
+def chain_hash(world, previous=None):
+    # Hash of the current state, chained onto the previous step's hash so a
+    # divergence at any step shows in every hash after it
+    h = hashlib.blake2b(previous or b"", digest_size=DIGEST_SIZE)
+    h.update(state_bytes(world))
+    return h.digest()
+
+
+def canonical_key(bodies):
+    # Sort key putting links in order of the bodies they join; links to
+    # bodies outside world.bodies go last, in their original order
+    index = {b: i for i, b in enumerate(bodies)}
+    n = len(bodies)
+
+    def key(link):
+        return index.get(getattr(link, "a", None), n), index.get(getattr(link, "b", None), n)
+    return key
+
+
+# -------------------------------
+# Lockstep comparison
+# -------------------------------
+def run_lockstep(worlds, frames, dt=1 / 60):
+    # Steps several worlds side by side in deterministic mode. Returns the
+    # first frame (1-based) where their state hashes disagree, or None if
+    # they stayed identical for all frames.
+    for w in worlds:
+        w.deterministic = True
+    for frame in range(1, frames + 1):
+        hashes = set()
+        for w in worlds:
+            w.step(dt)
+            hashes.add(w.state_hash)
+        if len(hashes) > 1:
+            return frame
+    return None
+
+
+def variants(build, attrs=None):
+    # Factories for the reference serial world and for the alternative code
+    # paths that must match it bit for bit
+    from broadphase import BruteForce, SpatialHash
+    from world import World
+
+    def factory(array_store=False, parallel=None, **extra):
+        def make():
+            world = World(array_store=array_store)
+            for key, value in dict(attrs or {}, **extra).items():
+                setattr(world, key, value)
+            build(world)
+            if parallel:
+                # Every frame on the parallel path, however it times
+                world.enable_parallel(parallel, workers=4, min_bodies=0, measure=False)
+            return world
+        return make
+
+    found = {
+        "reference": factory(),
+        "spatial_hash": factory(broadphase=SpatialHash()),
+        "brute_force": factory(broadphase=BruteForce()),
+        "parallel_thread": factory(parallel="thread"),
+        "parallel_process": factory(parallel="process"),
+    }
+    from body_store import np
+    if np is not None:
+        found["array_store"] = factory(array_store=True)
+    return found
+
+
+# Scenes checked by default, and pairs of scenes that build the same bodies
+# through different code paths
+DEFAULT_SCENES = ("two_balls", "box_box_impulse", "offset_box_drop", "distance_joint",
+                  "rope_chain", "spring", "circles_100", "box_stack_20", "rope_200", "soft_body_20")
+MATCHING_SCENES = (("soft_body_20", "soft_body_20_network"),)
+
+
+def _compare(label, make_a, make_b, frames):
+    a, b = make_a(), make_b()
+    frame = run_lockstep([a, b], frames)
+    for w in (a, b):
+        if w.parallel is not None:
+            w.parallel.shutdown()
+    print(f"{label:40s} {'identical' if frame is None else f'diverged at frame {frame}'}")
+    return frame is None
+
+
+def main():
+    # python lockstep.py box_stack_20 rope_200 --frames 300
+    import argparse
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    from scenes import SCENES
+
+    parser = argparse.ArgumentParser(description="Check alternative step paths against the serial reference")
+    parser.add_argument("scenes", nargs="*", help="benchmark scene names")
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    names = args.scenes or DEFAULT_SCENES
+    ok = True
+    for name in names:
+        build, _, _, attrs = SCENES[name]
+        paths = variants(build, attrs)
+        reference = paths.pop("reference")
+        for label, make in paths.items():
+            ok &= _compare(f"{name} / {label}", reference, make, args.frames)
+    for first, second in MATCHING_SCENES:
+        if first in names and second in SCENES:
+            ok &= _compare(f"{first} / {second}", variants(SCENES[first][0])["reference"],
+                           variants(SCENES[second][0])["reference"], args.frames)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
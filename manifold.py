@@ -0,0 +1,192 @@
+from vector import Vec2
+
+# Approach speed below which contacts stop bouncing, so resting stacks
+# don't jitter from restitution applied to gravity's per-substep velocity
+RESTITUTION_THRESHOLD = 0.5
+
+
+class Ground:
+    # Immovable stand-in for the ground plane so it can sit in a Manifold
+    def __init__(self, y):
+        self.pos = Vec2(0, y)
+        self.vel = Vec2(0, 0)
+        self.ang_vel = 0.0
+        self.inv_mass = 0.0
+        self.inv_inertia = 0.0
+
+
+class Contact:
+    __slots__ = ("point", "feature", "separation", "ra", "rb",
+                 "mass_n", "mass_t", "bias", "jn", "jt")
+
+    def __init__(self, point, feature, separation=0.0):
+        self.point = point
+        # Which vertex generated the point, used to match contacts across substeps
+        self.feature = feature
+        # Negative when penetrating, positive for speculative contacts
+        self.separation = separation
+        self.ra = None
+        self.rb = None
+        self.mass_n = 0.0
+        self.mass_t = 0.0
+        self.bias = 0.0
+        # Accumulated normal / tangent impulses
+        self.jn = 0.0
+        self.jt = 0.0
+
+
+# -------------------------------
+# Contact manifold (sequential impulses)
+# -------------------------------
+class Manifold:
+    def __init__(self, a, b, normal, contacts, restitution, mu, penetration=0.0, correction=1.0):
+        # normal points from a to b
+        self.a = a
+        self.b = b
+        self.normal = normal
+        self.contacts = contacts
+        self.restitution = restitution
+        self.mu = mu
+        # Depth measured by the narrowphase, and the fraction of it removed
+        # by the position pass at the end of the substep
+        self.penetration = penetration
+        self.correction = correction
+
+    def warm_from(self, old):
+        # Carry accumulated impulses over from last substep's manifold for
+        # contacts generated by the same feature along a similar normal
+        if old.normal.dot(self.normal) < 0.95:
+            return
+        previous = {c.feature: c for c in old.contacts}
+        for c in self.contacts:
+            match = previous.get(c.feature)
+            if match is not None:
+                c.jn = match.jn
+                c.jt = match.jt
+
+    def pre_step(self, dt=None):
+        # Effective masses and velocity bias. Must run for every manifold
+        # before any of them is warm-started, so restitution only reacts to
+        # the approach speed bodies actually arrived with.
+        a, b, n = self.a, self.b, self.normal
+        t = n.perp()
+
+        for c in self.contacts:
+            c.ra = c.point - a.pos
+            c.rb = c.point - b.pos
+
+            ra_cn = c.ra.cross(n)
+            rb_cn = c.rb.cross(n)
+            k_n = a.inv_mass + b.inv_mass + ra_cn ** 2 * a.inv_inertia + rb_cn ** 2 * b.inv_inertia
+            c.mass_n = 1.0 / k_n if k_n > 0 else 0.0
+
+            ra_ct = c.ra.cross(t)
+            rb_ct = c.rb.cross(t)
+            k_t = a.inv_mass + b.inv_mass + ra_ct ** 2 * a.inv_inertia + rb_ct ** 2 * b.inv_inertia
+            c.mass_t = 1.0 / k_t if k_t > 0 else 0.0
+
+            dvx, dvy = self._relative_velocity_xy(c)
+            vn = dvx * n.x + dvy * n.y
+            c.bias = 0.0
+            if vn < -RESTITUTION_THRESHOLD:
+                c.bias = -self.restitution * vn
+            if c.separation > 0 and dt:
+                # Speculative contact: allow closing the gap this substep
+                c.bias = max(c.bias, -c.separation / dt)
+
+    def warm_start(self):
+        # Re-apply last substep's accumulated impulses
+        n = self.normal
+        t = n.perp()
+        for c in self.contacts:
+            self._apply_xy(c, n.x * c.jn + t.x * c.jt, n.y * c.jn + t.y * c.jt)
+
+    def solve(self):
+        # Hot loop: plain floats rather than Vec2 temporaries. Returns the
+        # largest impulse change, so callers can stop iterating once the
+        # solve has converged.
+        nx, ny = self.normal.x, self.normal.y
+        tx, ty = -ny, nx
+        largest = 0.0
+
+        for c in self.contacts:
+            # Normal impulse, clamped on the accumulated total
+            dvx, dvy = self._relative_velocity_xy(c)
+            vn = dvx * nx + dvy * ny
+            jn0 = c.jn
+            c.jn = max(jn0 + c.mass_n * (-vn + c.bias), 0.0)
+            dj = c.jn - jn0
+            if dj != 0.0:
+                self._apply_xy(c, nx * dj, ny * dj)
+                if abs(dj) > largest:
+                    largest = abs(dj)
+
+            # Friction impulse, bounded by the accumulated normal impulse
+            dvx, dvy = self._relative_velocity_xy(c)
+            vt = dvx * tx + dvy * ty
+            max_jt = self.mu * c.jn
+            jt0 = c.jt
+            c.jt = max(-max_jt, min(max_jt, jt0 - vt * c.mass_t))
+            djt = c.jt - jt0
+            if djt != 0.0:
+                self._apply_xy(c, tx * djt, ty * djt)
+                if abs(djt) > largest:
+                    largest = abs(djt)
+        return largest
+
+    def correct_positions(self):
+        # Push the bodies apart along the normal, split by inverse mass
+        if self.penetration <= 0:
+            return
+        a, b = self.a, self.b
+        inv_mass_sum = a.inv_mass + b.inv_mass
+        if inv_mass_sum == 0:
+            return
+        corr = self.normal * (self.penetration * self.correction / inv_mass_sum)
+        a.pos.add_scaled(corr, -a.inv_mass)
+        b.pos.add_scaled(corr, b.inv_mass)
+
+    def _relative_velocity_xy(self, c):
+        # v_b + w_b x r_b - v_a - w_a x r_a
+        a, b = self.a, self.b
+        ra, rb = c.ra, c.rb
+        wa, wb = a.ang_vel, b.ang_vel
+        va, vb = a.vel, b.vel
+        return (vb.x - rb.y * wb - va.x + ra.y * wa,
+                vb.y + rb.x * wb - va.y - ra.x * wa)
+
+    def _apply_xy(self, c, px, py):
+        a, b = self.a, self.b
+        ra, rb = c.ra, c.rb
+        # Velocities are updated in place: no Vec2 per impulse
+        if a.inv_mass:
+            va = a.vel
+            va.x -= px * a.inv_mass
+            va.y -= py * a.inv_mass
+            a.ang_vel -= (ra.x * py - ra.y * px) * a.inv_inertia
+        if b.inv_mass:
+            vb = b.vel
+            vb.x += px * b.inv_mass
+            vb.y += py * b.inv_mass
+            b.ang_vel += (rb.x * py - rb.y * px) * b.inv_inertia
+
+
+class ManifoldCache:
+    # Manifolds keyed by body pair, kept from one substep to the next so
+    # their accumulated impulses can warm-start the solver
+    def __init__(self):
+        self.manifolds = {}
+
+    def update(self, found):
+        # found: {pair_key: Manifold} generated this substep. Pairs that
+        # stopped touching are dropped.
+        old = self.manifolds
+        for key, m in found.items():
+            prev = old.get(key)
+            if prev is not None:
+                m.warm_from(prev)
+        self.manifolds = found
+        return list(found.values())
+
+    def clear(self):
+        self.manifolds = {}
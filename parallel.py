@@ -0,0 +1,304 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+from island import build_islands
+from world import MAX_ANG_VEL, World
+
+
+# -------------------------------
+# Island solve (thread mode)
+# -------------------------------
+def solve_island(manifolds, constraints, circles, iterations):
+    # The solver half of World.step for one group of independent islands:
+    # velocity iterations, angular clamp, single position pass
+    for _ in range(iterations):
+        for m in manifolds:
+            m.solve()
+        for c in constraints:
+            c.solve()
+
+    for b in circles:
+        b.ang_vel = max(-MAX_ANG_VEL, min(MAX_ANG_VEL, b.ang_vel))
+
+    for m in manifolds:
+        m.correct_positions()
+
+
+def _circles(bodies):
+    return [b for b in bodies if b.shape == "circle"]
+
+
+# -------------------------------
+# Frame groups (process mode)
+# -------------------------------
+# Process mode ships whole groups of islands once per frame and lets each
+# worker run every substep of the frame on its copy. Islands are found up
+# front from bounding circles grown by the distance a body can cover in the
+# frame (twice its current speed plus gravity, for knocks from inside its own
+# island), and checked again on the result: if two groups ended up within
+# broadphase range of each other the frame is thrown away and run serially.
+REACH_SLACK = 0.1
+
+# World settings a worker needs to run substeps like the parent
+_SETTINGS = ("gravity", "iterations", "adaptive", "min_iterations", "impulse_tolerance",
+             "position_tolerance", "ground_y", "warm_starting", "materials", "broadphase",
+             "deterministic", "_ground")
+
+
+class _Near:
+    # Two bodies that may touch within the frame; joins them in build_islands
+    __slots__ = ("a", "b")
+
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+
+
+def _bounds(bodies, margin, reach=None):
+    # Boxes around bounding circles, fattened by margin (plus reach[k])
+    boxes = []
+    for k, b in enumerate(bodies):
+        r = b.bounding_radius + margin + (reach[k] if reach else 0.0)
+        x, y = b.pos.x, b.pos.y
+        boxes.append((x - r, y - r, x + r, y + r))
+    return boxes
+
+
+def _overlaps(boxes):
+    # Index pairs of overlapping boxes, by a sweep along x
+    order = sorted(range(len(boxes)), key=lambda k: boxes[k][0])
+    found = []
+    for n, i in enumerate(order):
+        box_i = boxes[i]
+        for j in order[n + 1:]:
+            box_j = boxes[j]
+            if box_j[0] > box_i[2]:
+                break
+            if box_i[1] <= box_j[3] and box_j[1] <= box_i[3]:
+                found.append((i, j))
+    return found
+
+
+def _step_group(settings, bodies, constraints, springs, cached, dt, substeps):
+    # Worker side: a throwaway World over one group, stepped through the
+    # same substeps as World.step
+    world = World()
+    world.__dict__.update(settings)
+    world.bodies = bodies
+    world.constraints = list(constraints)
+    world.springs = springs
+    world.manifolds.manifolds = cached
+    bullets = [b for b in bodies if b.bullet and b.is_active()]
+    for _ in range(substeps):
+        world._substep(dt / substeps, bullets)
+    return (bodies, world._ground, world.manifolds.manifolds,
+            [getattr(c, "broken", False) for c in constraints], world.last_iterations)
+
+
+def _copy_state(dst, src):
+    dst.pos.set(src.pos.x, src.pos.y)
+    dst.vel.set(src.vel.x, src.vel.y)
+    dst.force.set(src.force.x, src.force.y)
+    dst.angle = src.angle
+    dst.ang_vel = src.ang_vel
+    dst.torque = src.torque
+
+
+# -------------------------------
+# Island solver
+# -------------------------------
+class IslandSolver:
+    # Solves independent islands concurrently. mode="thread" solves them on
+    # the real objects in a thread pool, once per substep; mode="process"
+    # ships groups of islands to a process pool once per frame (see above).
+    # Both give the same result as the serial step.
+    #
+    # Dispatch has a fixed cost per job, so by default each frame is timed
+    # and frames only take the parallel path while it has measured faster
+    # than serial; the slower path is timed again every probe_interval
+    # frames in case the scene changed. measure=False always dispatches.
+    def __init__(self, mode="thread", workers=None, min_bodies=200, measure=True):
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        # Worlds with fewer bodies than this are solved serially
+        self.min_bodies = min_bodies
+        self.measure = measure
+        self.probe_interval = 60
+        # Seconds per frame of each path, keyed by "parallel" / "serial"
+        self.cost = {"parallel": None, "serial": None}
+        self.frames = {"parallel": 0, "serial": 0}
+        self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            pool_cls = ThreadPoolExecutor if self.mode == "thread" else ProcessPoolExecutor
+            self._pool = pool_cls(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    # -------------------------------
+    # Frame
+    # -------------------------------
+    def _eligible(self, world):
+        if len(world.bodies) < self.min_bodies or self.workers < 2:
+            return False
+        if world.circle_solver != "scalar" or world.constraint_solver != "scalar":
+            return False
+        if self.mode == "process":
+            # Sleeping and spring networks reach across the whole world
+            return not world.allow_sleep and not world.spring_networks
+        return True
+
+    def _choose(self):
+        if not self.measure:
+            return True
+        parallel, serial = self.cost["parallel"], self.cost["serial"]
+        if parallel is None:
+            return True
+        if serial is None:
+            return False
+        faster = parallel < serial
+        if sum(self.frames.values()) % self.probe_interval == 0:
+            return not faster
+        return faster
+
+    def run(self, world, dt, substeps, bullets):
+        # The substeps of one World.step
+        eligible = self._eligible(world)
+        parallel = eligible and self._choose()
+        started = self._pool is not None
+        start = perf_counter()
+
+        done = parallel and self.mode == "process" and self._step_groups(world, dt, substeps)
+        if done and world.profiler is not None:
+            world.profiler.record("parallel_frame", start)
+        if not done:
+            for _ in range(substeps):
+                world._substep(dt / substeps, bullets, parallel and self.mode == "thread")
+
+        if eligible:
+            path = "parallel" if parallel else "serial"
+            self.frames[path] += 1
+            # The frame that started the pool isn't representative
+            if started or not parallel:
+                elapsed = perf_counter() - start
+                cost = self.cost[path]
+                self.cost[path] = elapsed if cost is None else 0.5 * (cost + elapsed)
+
+    # -------------------------------
+    # Thread mode: islands of one substep
+    # -------------------------------
+    def _balance(self, islands, work):
+        # Longest-processing-time first: biggest islands go to the least
+        # loaded worker, one job per worker to amortize dispatch overhead
+        bins = [[0, []] for _ in range(min(self.workers, len(islands)))]
+        for island in sorted(islands, key=lambda island: -work(island)):
+            target = min(bins, key=lambda b: b[0])
+            target[0] += work(island)
+            target[1].append(island)
+        return [group for _, group in bins]
+
+    def _chunks(self, islands):
+        def work(island):
+            return sum(len(m.contacts) for m in island.manifolds) + len(island.constraints) + 1
+
+        chunks = []
+        for group in self._balance(islands, work):
+            manifolds, constraints, circles = [], [], []
+            for island in group:
+                manifolds += island.manifolds
+                constraints += island.constraints
+                circles += _circles(island.bodies)
+            chunks.append((manifolds, constraints, circles))
+        return chunks
+
+    def solve(self, islands, iterations):
+        pool = self._executor()
+        futures = [pool.submit(solve_island, m, c, b, iterations) for m, c, b in self._chunks(islands)]
+        for f in futures:
+            f.result()
+
+    # -------------------------------
+    # Process mode: groups of islands for a whole frame
+    # -------------------------------
+    def _groups(self, world, dt):
+        bodies = world.bodies
+        margin = getattr(world.broadphase, "margin", 0.0) + REACH_SLACK
+        fall = world.gravity.length() * dt
+        reach = [2.0 * (b.vel.length() + fall) * dt if b.inv_mass != 0 else 0.0 for b in bodies]
+        near = [_Near(bodies[i], bodies[j])
+                for i, j in _overlaps(_bounds(bodies, margin, reach))]
+        islands = build_islands(bodies, near, world.constraints, world.springs)
+        if len(islands) < 2:
+            return []
+
+        def work(island):
+            return len(island.bodies) + len(island.manifolds) + len(island.constraints)
+
+        groups = []
+        for group in self._balance(islands, work):
+            members = set()
+            for island in group:
+                members.update(island.bodies)
+                # Static bodies the island may touch go along as copies
+                members.update(x for n in island.manifolds for x in (n.a, n.b))
+            groups.append(members)
+        return groups
+
+    def _step_groups(self, world, dt, substeps):
+        groups = self._groups(world, dt)
+        if len(groups) < 2:
+            return False
+
+        settings = {name: getattr(world, name) for name in _SETTINGS}
+        cached = world.manifolds.manifolds
+        jobs = []
+        for members in groups:
+            jobs.append(([b for b in world.bodies if b in members],
+                         [c for c in world.constraints if c.a in members or c.b in members],
+                         [s for s in world.springs if s.a in members or s.b in members],
+                         {key: m for key, m in cached.items() if key[0] in members or key[1] in members}))
+        pool = self._executor()
+        futures = [pool.submit(_step_group, settings, bodies, constraints, springs, pairs, dt, substeps)
+                   for bodies, constraints, springs, pairs in jobs]
+        results = [f.result() for f in futures]
+
+        # A group may have reached another one after all: redo the frame
+        margin = getattr(world.broadphase, "margin", 0.0)
+        moved, owner = [], []
+        for k, (bodies, *_) in enumerate(results):
+            dynamic = [b for b in bodies if b.inv_mass != 0]
+            moved += dynamic
+            owner += [k] * len(dynamic)
+        if any(owner[i] != owner[j] for i, j in _overlaps(_bounds(moved, margin))):
+            return False
+
+        manifolds = {}
+        iterations = 0
+        for (bodies, constraints, _, _), (copies, ground, pairs, broken, used) in zip(jobs, results):
+            original = dict(zip(map(id, copies), bodies))
+            original[id(ground)] = world._ground
+            for b, copy in zip(bodies, copies):
+                if b.inv_mass != 0:
+                    _copy_state(b, copy)
+            for (a, b), m in pairs.items():
+                m.a, m.b = original[id(m.a)], original[id(m.b)]
+                manifolds[(original[id(a)], original[id(b)])] = m
+            for c, flag in zip(constraints, broken):
+                if flag:
+                    c.broken = True
+            iterations = max(iterations, used)
+        world.manifolds.manifolds = manifolds
+        world.last_iterations = iterations
+
+        kept = [c for c in world.constraints if not getattr(c, "broken", False)]
+        if len(kept) != len(world.constraints):
+            world.constraints = kept
+        return True
@@ -0,0 +1,130 @@
+import json
+from time import perf_counter
+
+
+# -------------------------------
+# World.step instrumentation
+# -------------------------------
+class StepProfiler:
+    # Opt-in phase timer for World.step: world.profiler = StepProfiler().
+    # World calls record() at the end of each phase with the time the phase
+    # started and chains the returned time into the next phase, so a step
+    # costs one perf_counter() call per phase. With world.profiler = None
+    # (the default) the hooks are skipped entirely.
+    #
+    # trace=True also keeps every phase as a Chrome trace event; open the
+    # file written by write_chrome_trace() in chrome://tracing or Perfetto.
+    def __init__(self, trace=False, max_events=1_000_000):
+        self.trace = trace
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.step_time = 0.0
+        self.phases = {}    # phase -> [seconds, calls], over all frames
+        self.counters = {}  # counter -> total, over all frames
+        self.last = None    # breakdown of the latest frame, see end_frame()
+        self.events = []
+        self._origin = perf_counter()
+        self._frame = None
+        self._substep = None
+
+    # -------------------------------
+    # Hooks called by World.step
+    # -------------------------------
+    def begin_frame(self):
+        self._frame = {"phases": {}, "counters": {}, "substeps": [], "iterations": []}
+        self._frame_start = perf_counter()
+        return self._frame_start
+
+    def begin_substep(self):
+        self._substep = {}
+        self._frame["substeps"].append(self._substep)
+        return perf_counter()
+
+    def end_substeps(self):
+        # Phases recorded after this (e.g. sleep) belong to the frame only
+        self._substep = None
+        return perf_counter()
+
+    def record(self, phase, start, iteration=None):
+        end = perf_counter()
+        elapsed = end - start
+
+        total = self.phases.get(phase)
+        if total is None:
+            total = self.phases[phase] = [0.0, 0]
+        total[0] += elapsed
+        total[1] += 1
+
+        frame = self._frame["phases"]
+        frame[phase] = frame.get(phase, 0.0) + elapsed
+        if self._substep is not None:
+            self._substep[phase] = self._substep.get(phase, 0.0) + elapsed
+        if iteration is not None:
+            iterations = self._frame["iterations"]
+            if iteration == len(iterations):
+                iterations.append(0.0)
+            iterations[iteration] += elapsed
+
+        if self.trace:
+            args = {}
+            if self._substep is not None:
+                args["substep"] = len(self._frame["substeps"]) - 1
+            if iteration is not None:
+                args["iteration"] = iteration
+            self._event(phase, start, elapsed, args)
+        return end
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        frame = self._frame["counters"]
+        frame[name] = frame.get(name, 0) + n
+
+    def end_frame(self):
+        end = perf_counter()
+        elapsed = end - self._frame_start
+        self.frames += 1
+        self.step_time += elapsed
+
+        frame = self._frame
+        frame["step"] = elapsed
+        self.last = frame
+        self._frame = None
+        self._substep = None
+
+        if self.trace:
+            self._event("step", self._frame_start, elapsed, {"frame": self.frames - 1})
+            ts = (end - self._origin) * 1e6
+            for name, value in frame["counters"].items():
+                self._append({"name": name, "ph": "C", "ts": ts, "pid": 0, "tid": 0,
+                              "args": {name: value}})
+
+    def _event(self, name, start, elapsed, args):
+        self._append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                      "ts": (start - self._origin) * 1e6, "dur": elapsed * 1e6,
+                      "args": args})
+
+    def _append(self, event):
+        if len(self.events) < self.max_events:
+            self.events.append(event)
+
+    # -------------------------------
+    # Export
+    # -------------------------------
+    def as_dict(self):
+        frames = max(self.frames, 1)
+        return {
+            "frames": self.frames,
+            "ms_per_step": self.step_time / frames * 1000,
+            "phases": {name: {"ms_per_step": seconds / frames * 1000, "calls": calls}
+                       for name, (seconds, calls) in self.phases.items()},
+            "counters_per_step": {name: total / frames for name, total in self.counters.items()},
+            "counters": dict(self.counters),
+            "last": self.last,
+        }
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
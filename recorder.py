@@ -0,0 +1,261 @@
+import json
+import struct
+
+from body import Body
+from constraints import DistanceJoint, RopeConstraint, Spring
+from vector import Vec2
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for recording and loading
+    np = None
+
+MAGIC = b"PE2DTRAJ"
+VERSION = 1
+# magic, version, header size, frames written, frame capacity
+_PREFIX = struct.Struct("<8sIIQQ")
+_FRAMES_OFFSET = 16
+_ALIGN = 64
+
+
+def record_dtype(precision="float32"):
+    # One fixed-size record per body per frame
+    f = np.dtype(precision)
+    return np.dtype([("body", np.int32), ("pos", f, (2,)), ("angle", f),
+                     ("vel", f, (2,)), ("ang_vel", f)])
+
+
+def describe_body(body):
+    # Header entry: enough to rebuild the body's shape for replay
+    entry = {"shape": body.shape, "mass": body.mass}
+    if body.shape == "circle":
+        entry["radius"] = body.radius
+    elif body.shape == "box":
+        entry["width"], entry["height"] = body.width, body.height
+    else:
+        entry["vertices"] = [list(v) for v in body._local_vertices]
+    return entry
+
+
+def describe_links(world, index):
+    # Constraints and springs between recorded bodies, as (a, b, kind)
+    links = []
+    for c in list(world.constraints) + list(world.springs):
+        a, b = index.get(c.a), index.get(c.b)
+        if a is not None and b is not None:
+            links.append([a, b, type(c).__name__])
+    return links
+
+
+# -------------------------------
+# Recording
+# -------------------------------
+class TrajectoryRecorder:
+    # Appends every body's pose and velocity after each World.step to a
+    # memory-mapped file: world.recorder = TrajectoryRecorder("run.traj", world).
+    # The file is preallocated for `capacity` frames and doubled when it
+    # fills up, so history lives on disk rather than in RAM. The bodies
+    # (and the constraints between them) are fixed when the recorder is
+    # created; bodies added to the world later are not recorded.
+    #
+    # Layout: a 32-byte prefix (see _PREFIX), a JSON header describing the
+    # bodies, padding to a 64-byte boundary, then frames * len(bodies)
+    # records of record_dtype(precision). load_trajectory() maps it back.
+    # dt: the step the world is driven with, kept for playback timing.
+    def __init__(self, path, world, dt=1 / 60, capacity=3600, precision="float32", every=1,
+                 meta=None):
+        if np is None:
+            raise ImportError("TrajectoryRecorder requires numpy")
+        self.path = path
+        self.bodies = list(world.bodies)
+        self.every = every
+        self.dtype = record_dtype(precision)
+        self.frames = 0
+        self._steps = 0
+
+        index = {b: i for i, b in enumerate(self.bodies)}
+        header = {
+            "precision": self.dtype["angle"].name,
+            "dt": dt,
+            "every": every,
+            "bodies": [describe_body(b) for b in self.bodies],
+            "links": describe_links(world, index),
+            "ground_y": world.ground_y,
+            "meta": meta or {},
+        }
+        text = json.dumps(header).encode()
+        size = _PREFIX.size + len(text)
+        self.header_size = size + (-size % _ALIGN)
+
+        with open(path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, VERSION, self.header_size, 0, 0))
+            f.write(text)
+            f.write(b"\0" * (self.header_size - size))
+
+        self._prefix = np.memmap(path, dtype=np.uint8, mode="r+", shape=(_PREFIX.size,))
+        self._map(max(1, capacity))
+        # Scratch row, reused every frame; only pose and velocity change
+        self._row = np.zeros(len(self.bodies), dtype=self.dtype)
+        self._row["body"] = np.arange(len(self.bodies))
+
+    def _map(self, capacity):
+        # np.memmap extends the file in r+ mode when the shape needs it
+        self.capacity = capacity
+        self.records = np.memmap(self.path, dtype=self.dtype, mode="r+", offset=self.header_size,
+                                 shape=(capacity, len(self.bodies)))
+        self._write_counts()
+
+    def _write_counts(self):
+        self._prefix[_FRAMES_OFFSET:] = np.frombuffer(
+            struct.pack("<QQ", self.frames, self.capacity), dtype=np.uint8)
+
+    def record(self):
+        # Called by World.step after every step; only every `every`-th step
+        # is written
+        self._steps += 1
+        if (self._steps - 1) % self.every:
+            return
+        if self.frames == self.capacity:
+            self.records.flush()
+            self._map(self.capacity * 2)
+
+        values = np.array([(b.pos.x, b.pos.y, b.angle, b.vel.x, b.vel.y, b.ang_vel)
+                           for b in self.bodies], dtype=float).reshape(-1, 6)
+        row = self._row
+        row["pos"] = values[:, 0:2]
+        row["angle"] = values[:, 2]
+        row["vel"] = values[:, 3:5]
+        row["ang_vel"] = values[:, 5]
+        self.records[self.frames] = row
+        self.frames += 1
+        self._prefix[_FRAMES_OFFSET:_FRAMES_OFFSET + 8] = np.frombuffer(
+            struct.pack("<Q", self.frames), dtype=np.uint8)
+
+    def flush(self):
+        self.records.flush()
+        self._prefix.flush()
+
+    def close(self, trim=True):
+        # trim=True cuts the file down to the frames actually written
+        if self.records is None:
+            return
+        self.flush()
+        self.records = None
+        self._prefix = None
+        if trim:
+            frame_size = self.dtype.itemsize * len(self.bodies)
+            with open(self.path, "r+b") as f:
+                f.truncate(self.header_size + self.frames * frame_size)
+                f.seek(_FRAMES_OFFSET)
+                f.write(struct.pack("<QQ", self.frames, self.frames))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------------
+# Loading
+# -------------------------------
+class Trajectory:
+    # Read-only view of a recorded file. records is a (frames, bodies)
+    # structured memmap, and pos/angle/vel/ang_vel are views into it, so
+    # slicing frames (traj.pos[1000:2000, 5]) reads from disk on demand
+    # without copying the rest.
+    def __init__(self, path, mode="r"):
+        if np is None:
+            raise ImportError("Trajectory requires numpy")
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError(f"{path}: not a trajectory file")
+            magic, version, header_size, frames, _ = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a trajectory file")
+            if version != VERSION:
+                raise ValueError(f"{path}: unsupported trajectory version {version}")
+            self.header = json.loads(f.read(header_size - _PREFIX.size).rstrip(b"\0"))
+
+        self.path = path
+        self.bodies = self.header["bodies"]
+        self.links = self.header["links"]
+        self.every = self.header["every"]
+        # Simulated seconds between two recorded frames
+        self.frame_dt = self.header["dt"] * self.every
+        self.dtype = record_dtype(self.header["precision"])
+        self.frames = frames
+        if frames:
+            self.records = np.memmap(path, dtype=self.dtype, mode=mode, offset=header_size,
+                                     shape=(frames, len(self.bodies)))
+        else:
+            self.records = np.zeros((0, len(self.bodies)), dtype=self.dtype)
+
+    def __len__(self):
+        return self.frames
+
+    def __getitem__(self, frame):
+        return self.records[frame]
+
+    def pose(self, frame):
+        # (x, y, angle) of every body at a frame; fractional frames blend
+        # the two neighbouring records
+        i = int(frame)
+        t = frame - i
+        if t == 0.0 or i + 1 >= self.frames:
+            return [(x, y, a) for (x, y), a in
+                    zip(self.pos[i].tolist(), self.angle[i].tolist())]
+        p0, p1 = self.pos[i:i + 2].astype(float)
+        a0, a1 = self.angle[i:i + 2].astype(float)
+        p = p0 + (p1 - p0) * t
+        a = a0 + (a1 - a0) * t
+        return [(x, y, ang) for (x, y), ang in zip(p.tolist(), a.tolist())]
+
+    def make_bodies(self):
+        # Bodies with the recorded shapes, for drawing; their state is
+        # whatever the caller poses them at
+        bodies = []
+        for entry in self.bodies:
+            shape, mass = entry["shape"], entry["mass"]
+            if shape == "circle":
+                bodies.append(Body(Vec2(0, 0), mass, radius=entry["radius"]))
+            elif shape == "box":
+                bodies.append(Body(Vec2(0, 0), mass, width=entry["width"], height=entry["height"]))
+            else:
+                bodies.append(Body(Vec2(0, 0), mass, vertices=[tuple(v) for v in entry["vertices"]]))
+        return bodies
+
+    def make_links(self, bodies):
+        # Stand-ins for the recorded constraints and springs, for drawing.
+        # Returns (constraints, springs); ropes that broke during the run
+        # are still drawn.
+        constraints, springs = [], []
+        for a, b, kind in self.links:
+            if kind == "Spring":
+                springs.append(Spring(bodies[a], bodies[b], 0.0, 0.0, 0.0))
+            elif kind == "RopeConstraint":
+                constraints.append(RopeConstraint(bodies[a], bodies[b], 0.0))
+            else:
+                constraints.append(DistanceJoint(bodies[a], bodies[b], 0.0))
+        return constraints, springs
+
+    @property
+    def pos(self):
+        return self.records["pos"]
+
+    @property
+    def angle(self):
+        return self.records["angle"]
+
+    @property
+    def vel(self):
+        return self.records["vel"]
+
+    @property
+    def ang_vel(self):
+        return self.records["ang_vel"]
+
+
+def load_trajectory(path):
+    return Trajectory(path)
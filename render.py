@@ -1,12 +1,15 @@
 import math
 import pygame
-from geometry import box_vertices
+from geometry import transform_vertices
 from vector import Vec2
 
 PPM = 100  # pixels per meter
 SCREEN_W = 1000
 SCREEN_H = 800
 GROUND_Y=-3
+BACKGROUND = (0, 0, 0)
+BODY_COLOR = (200, 200, 255)
+AXIS_COLOR = (255, 50, 50)
 def to_screen(v):
     return int(v.x * PPM), int(SCREEN_H - v.y * PPM)
 
@@ -17,68 +20,195 @@ def world_to_screen(pos):
     return x_screen, y_screen
 
 
+def draw_link(screen, world_to_screen, a, b, color, width=2, pose=None):
+    # Line between two bodies (constraints, springs); returns the changed rect.
+    # pose: optional callable body -> (x, y, angle), so links follow bodies
+    # drawn at an interpolated pose
+    if pose is None:
+        start, end = a.pos, b.pos
+    else:
+        start, end = Vec2(*pose(a)[:2]), Vec2(*pose(b)[:2])
+    return pygame.draw.line(screen, color, world_to_screen(start), world_to_screen(end), width)
+
+
 class Renderer:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
-        pygame.display.set_caption("Physics Engine Demo")
+    # headless: draw into an offscreen Surface instead of opening a window,
+    # e.g. for video export (see video.py); frame_bytes() returns the pixels.
+    # dirty_rects: clear and push to the display only the areas drawn this
+    # frame or the last one, instead of filling and flipping the whole screen.
+    # Every draw call's changed rect is collected either way.
+    def __init__(self, headless=False, dirty_rects=False):
+        self.headless = headless
+        self.dirty_rects = dirty_rects
+        self.size = (SCREEN_W, SCREEN_H)
+        if headless:
+            self.screen = pygame.Surface(self.size)
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode(self.size)
+            pygame.display.set_caption("Physics Engine Demo")
+        self.font = None
+        self._sprites = {}     # pixel radius -> pre-drawn circle outline
+        self._dirty = []       # rects drawn this frame
+        self._previous = None  # rects drawn last frame; None forces a full redraw
 
     def clear(self):
-        self.screen.fill((0, 0, 0))
+        if self.dirty_rects and self._previous is not None:
+            fill = self.screen.fill
+            for rect in self._previous:
+                fill(BACKGROUND, rect)
+        else:
+            self.screen.fill(BACKGROUND)
 
-    def draw_circle(self, body):
-        x, y = world_to_screen(body.pos)
+    # pose: optional (x, y, angle) to draw instead of the body's current
+    # state, e.g. FixedTimestep.pose() between two physics steps
+    def draw_circle(self, body, pose=None):
+        px, py, angle = pose if pose is not None else (body.pos.x, body.pos.y, body.angle)
+        x, y = world_to_screen(Vec2(px, py))
         # print("Ball Pos=", (x, y))
 
         r = int(body.radius * PPM)
         if r <= 0:
             return
 
-        pygame.draw.circle(
+        self._dirty.append(pygame.draw.circle(
             self.screen,
-            (200, 200, 255),
+            BODY_COLOR,
             (int(x), int(y)),
             r,
             2
-        )
+        ))
 
         # orientation line
-        end_x = x + int(r * math.cos(body.angle))
-        end_y = y - int(r * math.sin(body.angle))
+        end_x = x + int(r * math.cos(angle))
+        end_y = y - int(r * math.sin(angle))
 
-        pygame.draw.line(
+        self._dirty.append(pygame.draw.line(
             self.screen,
-            (255, 50, 50),
+            AXIS_COLOR,
             (int(x), int(y)),
             (int(end_x), int(end_y)),
             2
-        )
+        ))
 
-    def draw_box(self, body):
-        verts = box_vertices(body)
+    def draw_polygon(self, body, pose=None):
+        # Boxes and convex polygons, from the body's local vertices
+        px, py, angle = pose if pose is not None else (body.pos.x, body.pos.y, body.angle)
+        c, s = math.cos(angle), math.sin(angle)
+        verts = transform_vertices(body._local_vertices, px, py, c, s)
         pts = [world_to_screen(v) for v in verts]
 
-        pygame.draw.polygon(self.screen,(200, 200, 255),pts,2)
+        self._dirty.append(pygame.draw.polygon(self.screen,BODY_COLOR,pts,2))
 
         # orientation axis
-        center = world_to_screen(body.pos)
+        center = world_to_screen(Vec2(px, py))
         axis_len = body.width * 0.5 * PPM
 
-        end_x = center[0] + int(axis_len * math.cos(body.angle))
-        end_y = center[1] - int(axis_len * math.sin(body.angle))
+        end_x = center[0] + int(axis_len * c)
+        end_y = center[1] - int(axis_len * s)
+
+        self._dirty.append(pygame.draw.line(self.screen,AXIS_COLOR,center,(end_x, end_y),2))
 
-        pygame.draw.line(self.screen,(255, 50, 50),center,(end_x, end_y),2)
+    def draw_box(self, body, pose=None):
+        self.draw_polygon(body, pose)
 
-    def draw_body(self, body):
+    def draw_body(self, body, pose=None):
         if body.shape == "circle":
-            self.draw_circle(body)
-        elif body.shape == "box":
-            self.draw_box(body)
+            self.draw_circle(body, pose)
+        else:
+            self.draw_polygon(body, pose)
+
+    # -------------------------------
+    # Batched drawing
+    # -------------------------------
+    def _circle_sprite(self, r):
+        # Outline drawn once per pixel radius, then blitted
+        sprite = self._sprites.get(r)
+        if sprite is None:
+            sprite = pygame.Surface((2 * r + 1, 2 * r + 1))
+            sprite.fill(BACKGROUND)
+            sprite.set_colorkey(BACKGROUND)
+            pygame.draw.circle(sprite, BODY_COLOR, (r, r), r, 2)
+            self._sprites[r] = sprite
+        return sprite
+
+    def draw_bodies(self, bodies, pose=None):
+        # Same picture as draw_body() for each body (up to stacking order
+        # where bodies overlap), with fewer calls: circle outlines are
+        # blitted from cached sprites in one blits() call with their axis
+        # lines drawn on top afterwards, and boxes/polygons drawn at their
+        # physics pose reuse the world vertices and rotation cached by the
+        # step instead of redoing the trig. pose: optional callable
+        # body -> (x, y, angle), e.g. FixedTimestep.pose.
+        screen = self.screen
+        dirty = self._dirty
+        line, polygon = pygame.draw.line, pygame.draw.polygon
+        ox, oy = SCREEN_W / 2, SCREEN_H / 2
+        blits = []
+        spokes = []
+
+        for body in bodies:
+            pos = body.pos
+            if pose is None:
+                px, py, angle = pos.x, pos.y, body.angle
+                current = True
+            else:
+                px, py, angle = pose(body)
+                current = px == pos.x and py == pos.y and angle == body.angle
+            x, y = int(ox + px * PPM), int(oy - py * PPM)
+
+            if body.shape == "circle":
+                r = int(body.radius * PPM)
+                if r <= 0:
+                    continue
+                blits.append((self._circle_sprite(r), (x - r, y - r)))
+                spokes.append(((x, y), (x + int(r * math.cos(angle)), y - int(r * math.sin(angle)))))
+                continue
+
+            if current:
+                verts = body.get_vertices()
+                c, s = body.get_rotation()
+            else:
+                c, s = math.cos(angle), math.sin(angle)
+                verts = transform_vertices(body._local_vertices, px, py, c, s)
+            dirty.append(polygon(screen, BODY_COLOR,
+                                 [(int(ox + v.x * PPM), int(oy - v.y * PPM)) for v in verts], 2))
+            axis_len = body.width * 0.5 * PPM
+            dirty.append(line(screen, AXIS_COLOR, (x, y),
+                              (x + int(axis_len * c), y - int(axis_len * s)), 2))
+
+        if blits:
+            dirty.extend(screen.blits(blits))
+            for start, end in spokes:
+                dirty.append(line(screen, AXIS_COLOR, start, end, 2))
+
+    def draw_world(self, world, pose=None):
+        # Clear, then bodies, constraints, springs, ground and (when one is
+        # attached) the profiler overlay
+        self.clear()
+        self.draw_bodies(world.bodies, pose)
+        for c in world.constraints:
+            self.draw_constraint(c, pose)
+        for s in world.springs:
+            self.draw_spring(s, pose)
+        self.draw_ground(world.ground_y)
+        if world.profiler is not None:
+            self.draw_profiler(world.profiler)
 
     def draw_rope(self, a, b):
         ax, ay = world_to_screen(a.pos)
         bx, by = world_to_screen(b.pos)
-        pygame.draw.line(self.screen,(200, 200, 200),(ax, ay),(bx, by),2)
+        self._dirty.append(pygame.draw.line(self.screen,(200, 200, 200),(ax, ay),(bx, by),2))
+
+    def draw_constraint(self, c, pose=None):
+        rect = c.draw(self.screen, world_to_screen, pose)
+        if rect is not None:
+            self._dirty.append(rect)
+
+    def draw_spring(self, s, pose=None):
+        rect = s.draw_spring(self.screen, world_to_screen, s, pose=pose)
+        if rect is not None:
+            self._dirty.append(rect)
 
     def draw_ground(self, ground_y=GROUND_Y):
         visual_ground = ground_y  # <-- your ball radius
@@ -86,16 +216,64 @@ class Renderer:
         p1 = world_to_screen(Vec2(-20, visual_ground))
         p2 = world_to_screen(Vec2(20, visual_ground))
 
-        pygame.draw.line(self.screen, (0, 255, 0), p1, p2, 3)
+        self._dirty.append(pygame.draw.line(self.screen, (0, 255, 0), p1, p2, 3))
+
+    def draw_profiler(self, profiler):
+        # Latest frame's phase times and counters from a StepProfiler
+        frame = profiler.last
+        if frame is None:
+            return
+
+        lines = ["step %6.2f ms" % (frame["step"] * 1000)]
+        for name, seconds in sorted(frame["phases"].items(), key=lambda kv: -kv[1]):
+            lines.append("%-14s %6.2f ms" % (name, seconds * 1000))
+        for name, value in frame["counters"].items():
+            lines.append("%-14s %6d" % (name, value))
+
+        y = 10
+        for line in lines:
+            y += self._text(line, (10, y)).get_height() + 2
+
+    def _text(self, text, pos, color=(255, 255, 0)):
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+        surface = self.font.render(text, True, color)
+        self._dirty.append(self.screen.blit(surface, pos))
+        return surface
+
+    def timeline_rect(self):
+        # Screen area of the replay timeline bar, for mouse seeking
+        return pygame.Rect(10, SCREEN_H - 24, SCREEN_W - 20, 8)
+
+    def draw_timeline(self, fraction, label):
+        # Progress bar along the bottom edge plus a status line above it
+        bar = self.timeline_rect()
+        self._dirty.append(pygame.draw.rect(self.screen, (80, 80, 80), bar, 1))
+        filled = bar.copy()
+        filled.width = max(1, int(bar.width * min(max(fraction, 0.0), 1.0)))
+        self._dirty.append(pygame.draw.rect(self.screen, (255, 255, 0), filled))
+        self._text(label, (bar.x, bar.y - 18))
 
     def present(self):
         # draw world origin crosshair
-        pygame.draw.line(self.screen, (255, 255, 0),
-                         (SCREEN_W // 2 - 10, SCREEN_H // 2),
-                         (SCREEN_W // 2 + 10, SCREEN_H // 2), 2)
+        self._dirty.append(pygame.draw.line(self.screen, (255, 255, 0),
+                                            (SCREEN_W // 2 - 10, SCREEN_H // 2),
+                                            (SCREEN_W // 2 + 10, SCREEN_H // 2), 2))
+
+        self._dirty.append(pygame.draw.line(self.screen, (255, 255, 0),
+                                            (SCREEN_W // 2, SCREEN_H // 2 - 10),
+                                            (SCREEN_W // 2, SCREEN_H // 2 + 10), 2))
 
-        pygame.draw.line(self.screen, (255, 255, 0),
-                         (SCREEN_W // 2, SCREEN_H // 2 - 10),
-                         (SCREEN_W // 2, SCREEN_H // 2 + 10), 2)
+        if self.headless:
+            pass
+        elif self.dirty_rects and self._previous is not None:
+            # Last frame's rects get erased, this frame's get drawn
+            pygame.display.update(self._previous + self._dirty)
+        else:
+            pygame.display.flip()
+        self._previous, self._dirty = self._dirty, []
 
-        pygame.display.flip()
+    def frame_bytes(self):
+        # The current frame as packed RGB24 rows, for video writers
+        return pygame.image.tobytes(self.screen, "RGB")
@@ -0,0 +1,144 @@
+import argparse
+
+import pygame
+
+from recorder import load_trajectory
+from render import Renderer
+
+MIN_SPEED = 1 / 16
+MAX_SPEED = 256
+
+
+# -------------------------------
+# Playback state
+# -------------------------------
+class ReplayPlayer:
+    # Plays a recorded trajectory (see recorder.py) through the Renderer
+    # with no World involved: every frame is a direct index into the
+    # memory-mapped records, so seeking anywhere costs the same and a
+    # replay only pays for drawing. cursor is a fractional frame index;
+    # speed is in simulated seconds per real second, negative for reverse.
+    def __init__(self, trajectory, renderer):
+        self.trajectory = trajectory
+        self.renderer = renderer
+        self.bodies = trajectory.make_bodies()
+        self.constraints, self.springs = trajectory.make_links(self.bodies)
+        self.ground_y = trajectory.header["ground_y"]
+        self.last_frame = max(len(trajectory) - 1, 0)
+        self.cursor = 0.0
+        self.speed = 1.0
+        self.paused = False
+
+    def seek(self, frame):
+        self.cursor = min(max(float(frame), 0.0), float(self.last_frame))
+
+    def step_frames(self, count):
+        # Jump whole frames from the current one, e.g. +1 / -1 while paused
+        self.seek(round(self.cursor) + count)
+
+    def set_speed(self, speed):
+        sign = -1.0 if speed < 0 else 1.0
+        self.speed = sign * min(max(abs(speed), MIN_SPEED), MAX_SPEED)
+
+    def advance(self, elapsed):
+        # Move the cursor by `elapsed` real seconds of playback; stops at
+        # either end
+        if self.paused or not self.last_frame:
+            return
+        self.seek(self.cursor + elapsed * self.speed / self.trajectory.frame_dt)
+        if self.cursor >= self.last_frame if self.speed > 0 else self.cursor <= 0.0:
+            self.paused = True
+
+    def draw(self):
+        renderer = self.renderer
+        renderer.clear()
+        if len(self.trajectory):
+            for b, (x, y, angle) in zip(self.bodies, self.trajectory.pose(self.cursor)):
+                # Links read body positions, so the stand-ins are moved too
+                b.pos.set(x, y)
+                b.angle = angle
+                renderer.draw_body(b)
+        for c in self.constraints:
+            renderer.draw_constraint(c)
+        for s in self.springs:
+            renderer.draw_spring(s)
+        renderer.draw_ground(self.ground_y)
+
+        frame_dt = self.trajectory.frame_dt
+        state = "paused" if self.paused else f"{self.speed:g}x"
+        label = (f"frame {round(self.cursor)}/{self.last_frame}   "
+                 f"t = {self.cursor * frame_dt:.2f} / {self.last_frame * frame_dt:.2f} s   {state}")
+        renderer.draw_timeline(self.cursor / self.last_frame if self.last_frame else 0.0, label)
+
+    # -------------------------------
+    # Input
+    # -------------------------------
+    def handle(self, event):
+        # Space: pause, Left/Right: one frame (one second with Shift),
+        # Up/Down: double/halve speed, R: reverse, Home/End: jump to an
+        # end, click or drag on the timeline: seek
+        if event.type == pygame.KEYDOWN:
+            key = event.key
+            if key == pygame.K_SPACE:
+                self.paused = not self.paused
+            elif key in (pygame.K_LEFT, pygame.K_RIGHT):
+                count = 1
+                if event.mod & pygame.KMOD_SHIFT:
+                    count = max(1, round(1 / self.trajectory.frame_dt))
+                self.step_frames(count if key == pygame.K_RIGHT else -count)
+            elif key == pygame.K_UP:
+                self.set_speed(self.speed * 2)
+            elif key == pygame.K_DOWN:
+                self.set_speed(self.speed / 2)
+            elif key == pygame.K_r:
+                self.speed = -self.speed
+            elif key == pygame.K_HOME:
+                self.seek(0)
+            elif key == pygame.K_END:
+                self.seek(self.last_frame)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 or \
+                event.type == pygame.MOUSEMOTION and event.buttons[0]:
+            bar = self.renderer.timeline_rect()
+            if bar.inflate(0, 16).collidepoint(event.pos):
+                self.seek((event.pos[0] - bar.x) / bar.width * self.last_frame)
+
+
+def main():
+    # python replay.py run.traj --speed 4
+    parser = argparse.ArgumentParser(description="Play back a recorded trajectory")
+    parser.add_argument("path", help="file written by recorder.TrajectoryRecorder")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback rate, negative for reverse")
+    parser.add_argument("--start", type=float, default=0.0, help="start time in simulated seconds")
+    parser.add_argument("--fps", type=int, default=60, help="render rate")
+    args = parser.parse_args()
+
+    trajectory = load_trajectory(args.path)
+    renderer = Renderer(dirty_rects=True)
+    pygame.display.set_caption(f"Replay: {args.path}")
+    player = ReplayPlayer(trajectory, renderer)
+    player.set_speed(args.speed)
+    player.seek(args.start / trajectory.frame_dt)
+    clock = pygame.time.Clock()
+
+    print(f"{len(trajectory)} frames, {len(player.bodies)} bodies. "
+          "Space: pause, Left/Right: step, Up/Down: speed, R: reverse, click the bar to seek.")
+
+    running = True
+    while running:
+        frame_time = clock.tick(args.fps) / 1000
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            else:
+                player.handle(event)
+
+        player.advance(frame_time)
+        player.draw()
+        renderer.present()
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
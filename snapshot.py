@@ -0,0 +1,367 @@
+import gc
+import pickle
+import weakref
+from array import array
+
+from body import POLYGON, Body
+from manifold import Contact, Manifold
+from vector import Vec2
+
+# Per-body floats, in the order they are packed into WorldSnapshot.state /
+# .params. State changes every step; params only when scene code edits them.
+STATE_FIELDS = ("pos.x", "pos.y", "vel.x", "vel.y", "force.x", "force.y",
+                "angle", "ang_vel", "torque", "sleep_time")
+PARAM_FIELDS = ("mass", "inv_mass", "inv_inertia", "linear_damping", "angular_damping",
+                "sleep_linear_threshold", "sleep_angular_threshold", "time_to_sleep")
+# Shape data, fixed at construction; bodies of the same shape share one
+# template, and bodies rebuilt from it share its vertex lists
+SHAPE_FIELDS = ("shape", "shape_type", "radius", "width", "height", "area",
+                "_local_vertices", "_local_normals", "bounding_radius")
+SETTINGS = ("iterations", "substeps", "adaptive", "min_substeps", "max_substeps",
+            "substep_travel", "min_iterations", "impulse_tolerance", "position_tolerance",
+            "last_substeps", "last_iterations", "ground_y", "warm_starting",
+            "circle_solver", "constraint_solver", "allow_sleep", "deterministic", "state_hash")
+N_STATE = len(STATE_FIELDS)
+N_PARAMS = len(PARAM_FIELDS)
+AWAKE, BULLET = 1, 2
+GROUND = -1  # body index standing for the ground in manifold records
+# World attributes a restore with new bodies leaves to be built on first use
+LAZY = ("bodies", "constraints", "springs", "spring_networks", "_sleeping", "manifolds")
+
+
+def _shape_key(body):
+    # Circles and boxes are shared by size; polygons by vertex list
+    if body.shape_type == POLYGON:
+        return id(body._local_vertices)
+    return body.shape_type, body.radius, body.width, body.height
+
+
+def _copy_value(value):
+    # Mutable containers are copied on restore so the snapshot stays intact
+    if isinstance(value, (list, dict, set)):
+        return type(value)(value)
+    return value
+
+
+# -------------------------------
+# Capture
+# -------------------------------
+class WorldSnapshot:
+    # Everything World.step reads, as plain data: body state packed into
+    # float arrays, constraints and springs as (class, attributes) with body
+    # references replaced by indices, solver settings, sleeping islands, the
+    # contact impulses used for warm starting and the broadphase sort order.
+    # Restoring it and stepping gives the same results as the world it was
+    # taken from. to_bytes() / from_bytes() give a compact binary blob (a
+    # pickle: only load blobs you wrote yourself).
+    #
+    # Not captured: the profiler, the recorder, the parallel solver and any
+    # extra attributes scene code put on bodies.
+    def __init__(self, world):
+        bodies = list(world.bodies)
+        index = {b: i for i, b in enumerate(bodies)}
+
+        templates, keys = [], {}
+        shapes = array("i")
+        state = array("d")
+        params = array("d")
+        flags = bytearray()
+        for b in bodies:
+            key = _shape_key(b)
+            t = keys.get(key)
+            if t is None:
+                t = keys[key] = len(templates)
+                templates.append({name: getattr(b, name) for name in SHAPE_FIELDS})
+            shapes.append(t)
+            pos, vel, force = b.pos, b.vel, b.force
+            state.extend((pos.x, pos.y, vel.x, vel.y, force.x, force.y,
+                          b.angle, b.ang_vel, b.torque, b.sleep_time))
+            params.extend((b.mass, b.inv_mass, b.inv_inertia, b.linear_damping, b.angular_damping,
+                           b.sleep_linear_threshold, b.sleep_angular_threshold, b.time_to_sleep))
+            flags.append((AWAKE if b.awake else 0) | (BULLET if b.bullet else 0))
+
+        self.templates = templates
+        self.shapes = shapes
+        self.state = state
+        self.params = params
+        self.flags = bytes(flags)
+        # Links sharing a class and attribute names share one layout:
+        # (class, names, positions of the body references)
+        self.layouts = []
+        layouts = {}
+        self.constraints = [self._link(c, index, layouts) for c in world.constraints]
+        self.springs = [self._link(s, index, layouts) for s in world.springs]
+        self.networks = [self._network(net) for net in world.spring_networks]
+
+        self.settings = {name: getattr(world, name) for name in SETTINGS}
+        self.settings["gravity"] = (world.gravity.x, world.gravity.y)
+        self.settings["materials"] = dict(world.materials)
+        self.array_store = world.store is not None
+        bp = world.broadphase
+        self.broadphase = (type(bp), {k: _copy_value(v) for k, v in vars(bp).items()})
+
+        self.sleeping = [(index[b], tuple(index[g] for g in group))
+                         for b, group in world._sleeping.items()]
+        self.manifolds = [
+            (index.get(m.a, GROUND), index[m.b], m.normal.x, m.normal.y,
+             tuple((c.point.x, c.point.y, c.feature, c.separation, c.jn, c.jt)
+                   for c in m.contacts))
+            for m in world.manifolds.manifolds.values()]
+        batch = world._circle_batch
+        self.circle_batch = batch.impulses() if batch is not None else None
+
+        # Same-process rollback restores into the original objects, so
+        # references held by scene code stay valid. Not part of the blob.
+        # Their attribute values are kept too, so restore() only rewrites
+        # the links that changed since (usually just broken ropes).
+        self._source = weakref.ref(world)
+        self._bodies = bodies
+        self._links = (list(world.constraints), list(world.springs))
+        self._link_values = [[tuple(vars(obj).values()) for obj in objs] for objs in self._links]
+
+    def _link(self, obj, index, layouts):
+        # (layout, attribute values) with bodies as indices. Other values are
+        # taken as-is: constraints and springs only hold numbers and flags.
+        d = vars(obj)
+        key = (type(obj), tuple(d))
+        layout = layouts.get(key)
+        if layout is None:
+            ends = tuple(k for k, v in enumerate(d.values()) if isinstance(v, Body))
+            layout = layouts[key] = len(self.layouts)
+            self.layouts.append(key + (ends,))
+        values = list(d.values())
+        for k in self.layouts[layout][2]:
+            i = index.get(values[k])
+            if i is None:
+                raise ValueError(f"{type(obj).__name__}.{key[1][k]} is not in world.bodies")
+            values[k] = i
+        return layout, tuple(values)
+
+    @staticmethod
+    def _network(net):
+        net._flush()
+        return tuple(getattr(net, name).copy() for name in ("ia", "ib", "k", "c", "rest"))
+
+    def __len__(self):
+        return len(self.shapes)
+
+    # -------------------------------
+    # Serialization
+    # -------------------------------
+    _BLOB_FIELDS = ("templates", "shapes", "state", "params", "flags", "layouts", "constraints",
+                    "springs", "networks", "settings", "array_store", "broadphase",
+                    "sleeping", "manifolds", "circle_batch")
+
+    def to_bytes(self):
+        return pickle.dumps(tuple(getattr(self, name) for name in self._BLOB_FIELDS),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def from_bytes(cls, data):
+        snap = cls.__new__(cls)
+        for name, value in zip(cls._BLOB_FIELDS, pickle.loads(data)):
+            setattr(snap, name, value)
+        snap._source = None
+        snap._bodies = None
+        snap._links = None
+        snap._link_values = None
+        return snap
+
+    # -------------------------------
+    # Restore
+    # -------------------------------
+    def restore(self, world):
+        # Three ways to get the bodies back, cheapest first: the original
+        # objects when restoring into the world the snapshot came from, the
+        # world's current bodies when their shapes match, or new bodies
+        # built from the shape templates (no Body.__init__ work). New bodies
+        # are only built when something first reads world.bodies, its links
+        # or its contacts (see World.__getattr__), so fork() returns at once.
+        state = vars(world)
+        pending = state.pop("_pending", None)
+        if pending is not None:
+            # Still waiting on an earlier restore: drop it unbuilt
+            world.manifolds = pending[1]
+        if self._source is not None and self._source() is world:
+            self._write_bodies(self._bodies)
+            self._restore_objects(world, self._bodies, self._links)
+        elif "bodies" in state and self._shapes_match(world.bodies):
+            self._write_bodies(world.bodies)
+            self._restore_objects(world, world.bodies, None)
+        else:
+            cache = world.manifolds
+            for name in LAZY:
+                state.pop(name, None)
+            world._pending = (self, cache)
+
+        settings = self.settings
+        for name in SETTINGS:
+            setattr(world, name, settings[name])
+        world.gravity = Vec2(*settings["gravity"])
+        world.materials = dict(settings["materials"])
+        cls, attrs = self.broadphase
+        bp = cls.__new__(cls)
+        bp.__dict__.update({k: _copy_value(v) for k, v in attrs.items()})
+        world.broadphase = bp
+        world._ground.pos.y = world.ground_y
+        if self.circle_batch is not None and world._circle_batch is None:
+            from collision_batch import CircleBatchSolver
+            world._circle_batch = CircleBatchSolver()
+        if world._circle_batch is not None:
+            world._circle_batch.set_impulses(self.circle_batch)
+        return world
+
+    def build(self, world, cache):
+        # The deferred half of restore(), called by World.__getattr__. Values
+        # scene code assigned in the meantime win over the snapshot's.
+        assigned = {name: vars(world)[name] for name in LAZY if name in vars(world)}
+        # Thousands of new containers would trigger collections that only
+        # scan them; nothing here creates cycles
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            world.manifolds = cache
+            self._restore_objects(world, self._new_bodies(), None)
+        finally:
+            if enabled:
+                gc.enable()
+        vars(world).update(assigned)
+
+    def _restore_objects(self, world, bodies, links):
+        # Everything that refers to bodies: the body list, links, spring
+        # networks, sleeping islands and contact manifolds
+        world.bodies = list(bodies)
+        if links is not None:
+            for objs, values, records in zip(links, self._link_values,
+                                             (self.constraints, self.springs)):
+                for obj, taken, record in zip(objs, values, records):
+                    if tuple(vars(obj).values()) != taken:
+                        obj.__dict__.update(self._link_attrs(record, bodies))
+            world.constraints, world.springs = list(links[0]), list(links[1])
+        else:
+            world.constraints = self._new_links(self.constraints, bodies)
+            world.springs = self._new_links(self.springs, bodies)
+        world.spring_networks = [self._new_network(arrays) for arrays in self.networks]
+
+        world._sleeping = {bodies[i]: [bodies[g] for g in group] for i, group in self.sleeping}
+        ground = world._ground
+        manifolds = {}
+        for ia, ib, nx, ny, contacts in self.manifolds:
+            a = ground if ia == GROUND else bodies[ia]
+            b = bodies[ib]
+            found = []
+            for px, py, feature, separation, jn, jt in contacts:
+                c = Contact(Vec2(px, py), feature, separation)
+                c.jn, c.jt = jn, jt
+                found.append(c)
+            manifolds[(a, b)] = Manifold(a, b, Vec2(nx, ny), found, 0.0, 0.0)
+        world.manifolds.manifolds = manifolds
+
+    def _shapes_match(self, bodies):
+        if len(bodies) != len(self.shapes):
+            return False
+        templates = self.templates
+        for b, t in zip(bodies, self.shapes):
+            t = templates[t]
+            if (b.shape_type != t["shape_type"] or b.radius != t["radius"] or
+                    b.width != t["width"] or b.height != t["height"] or
+                    (b.shape_type == POLYGON and b._local_vertices != t["_local_vertices"])):
+                return False
+        return True
+
+    def _rows(self):
+        # (state, params, flags) per body, unpacked from the flat arrays
+        return zip(zip(*[iter(self.state.tolist())] * N_STATE),
+                   zip(*[iter(self.params.tolist())] * N_PARAMS),
+                   self.flags)
+
+    def _write_bodies(self, bodies):
+        for b, ((px, py, vx, vy, fx, fy, angle, ang_vel, torque, sleep_time),
+                (mass, inv_mass, inv_inertia, linear_damping, angular_damping,
+                 sleep_linear, sleep_angular, time_to_sleep),
+                f) in zip(bodies, self._rows()):
+            pos, vel, force = b.pos, b.vel, b.force
+            pos.x, pos.y = px, py
+            vel.x, vel.y = vx, vy
+            force.x, force.y = fx, fy
+            b.angle, b.ang_vel, b.torque, b.sleep_time = angle, ang_vel, torque, sleep_time
+            b.mass = mass
+            b.inv_mass = inv_mass
+            b.inv_inertia = inv_inertia
+            b.linear_damping = linear_damping
+            b.angular_damping = angular_damping
+            b.sleep_linear_threshold = sleep_linear
+            b.sleep_angular_threshold = sleep_angular
+            b.time_to_sleep = time_to_sleep
+            b.awake = bool(f & AWAKE)
+            b.bullet = bool(f & BULLET)
+
+    def _new_bodies(self):
+        # Each body's __dict__ starts as a copy of its template plus an empty
+        # transform cache, as after Body.__init__
+        bases = [dict(t, _rot_angle=None, _rot=(1.0, 0.0), _vert_pose=None) for t in self.templates]
+        new = object.__new__
+        vec = Vec2.__new__
+        bodies = []
+        for t, ((px, py, vx, vy, fx, fy, angle, ang_vel, torque, sleep_time), params, f) in \
+                zip(self.shapes, self._rows()):
+            d = bases[t].copy()
+            d.update(zip(PARAM_FIELDS, params))
+            # The values are floats already, so Vec2.__init__ is skipped
+            d["pos"] = pos = vec(Vec2)
+            pos.x, pos.y = px, py
+            d["vel"] = vel = vec(Vec2)
+            vel.x, vel.y = vx, vy
+            d["force"] = force = vec(Vec2)
+            force.x, force.y = fx, fy
+            d["angle"] = angle
+            d["ang_vel"] = ang_vel
+            d["torque"] = torque
+            d["sleep_time"] = sleep_time
+            d["awake"] = bool(f & AWAKE)
+            d["bullet"] = bool(f & BULLET)
+            d["_axes"] = []
+            d["_vertices"] = []
+            b = new(Body)
+            b.__dict__ = d
+            bodies.append(b)
+        return bodies
+
+    def _link_attrs(self, record, bodies):
+        layout, values = record
+        _, names, ends = self.layouts[layout]
+        if ends:
+            values = list(values)
+            for k in ends:
+                values[k] = bodies[values[k]]
+        return zip(names, values)
+
+    def _new_links(self, records, bodies):
+        # Same as _link_attrs, inlined: this runs once per link per fork
+        new = object.__new__
+        layouts = self.layouts
+        links = []
+        for layout, values in records:
+            cls, names, ends = layouts[layout]
+            if ends:
+                values = list(values)
+                for k in ends:
+                    values[k] = bodies[values[k]]
+            obj = new(cls)
+            obj.__dict__ = dict(zip(names, values))
+            links.append(obj)
+        return links
+
+    @staticmethod
+    def _new_network(arrays):
+        from spring_network import SpringNetwork
+        net = SpringNetwork()
+        net.ia, net.ib, net.k, net.c, net.rest = (a.copy() for a in arrays)
+        return net
+
+    def fork(self):
+        # A new, independent World starting from this checkpoint. Forks
+        # share the snapshot's shape templates (vertex and normal lists are
+        # never written) and build their bodies and links on first use.
+        from world import World
+        return self.restore(World(array_store=self.array_store))
@@ -0,0 +1,130 @@
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the batched solvers
+    np = None
+
+from constraints import Spring
+
+
+# -------------------------------
+# Vectorized spring network
+# -------------------------------
+class SpringNetwork:
+    # Many damped springs as arrays, for soft-body meshes: endpoints are
+    # indices into world.bodies, and k, c and rest are per-spring arrays that
+    # may be edited in place. apply() evaluates every spring in one pass and
+    # scatter-adds the forces in spring order, so a network gives bit-for-bit
+    # the same forces as the equivalent list of Spring objects.
+    #
+    # Add networks to world.spring_networks. Removing or reordering
+    # world.bodies invalidates the endpoint indices.
+    def __init__(self):
+        if np is None:
+            raise ImportError("SpringNetwork requires numpy")
+        self.ia = np.zeros(0, dtype=np.intp)
+        self.ib = np.zeros(0, dtype=np.intp)
+        self.k = np.zeros(0)
+        self.c = np.zeros(0)
+        self.rest = np.zeros(0)
+        self._pending = []
+
+    @classmethod
+    def from_springs(cls, bodies, springs):
+        index = {b: n for n, b in enumerate(bodies)}
+        net = cls()
+        for s in springs:
+            net.add(index[s.a], index[s.b], s.k, s.c, s.rest)
+        return net
+
+    def add(self, i, j, k, c, rest):
+        self._pending.append((i, j, k, c, rest))
+
+    def _flush(self):
+        if not self._pending:
+            return
+        i, j, k, c, rest = zip(*self._pending)
+        self._pending = []
+        self.ia = np.concatenate((self.ia, np.array(i, dtype=np.intp)))
+        self.ib = np.concatenate((self.ib, np.array(j, dtype=np.intp)))
+        self.k = np.concatenate((self.k, np.array(k, dtype=float)))
+        self.c = np.concatenate((self.c, np.array(c, dtype=float)))
+        self.rest = np.concatenate((self.rest, np.array(rest, dtype=float)))
+
+    def __len__(self):
+        return len(self.ia) + len(self._pending)
+
+    def sort(self):
+        # Stable sort by (a, b) index, the canonical order World's
+        # deterministic mode also gives world.springs
+        self._flush()
+        order = np.lexsort((self.ib, self.ia))
+        for name in ("ia", "ib", "k", "c", "rest"):
+            setattr(self, name, getattr(self, name)[order])
+
+    def springs(self, bodies):
+        # Equivalent Spring objects, e.g. for island building or drawing
+        self._flush()
+        return [Spring(bodies[i], bodies[j], k, c, rest) for i, j, k, c, rest in
+                zip(self.ia.tolist(), self.ib.tolist(), self.k.tolist(),
+                    self.c.tolist(), self.rest.tolist())]
+
+    # -------------------------------
+    # Force evaluation
+    # -------------------------------
+    def forces(self, pos, vel, ia, ib):
+        # Force on the b end of every spring (the a end gets the negation),
+        # and which springs are long enough to have a direction
+        d = pos[ib] - pos[ia]
+        dx, dy = d[:, 0], d[:, 1]
+        length = np.sqrt(dx * dx + dy * dy)
+        live = length > 1e-8
+        inv = 1 / np.where(live, length, 1.0)
+        nx, ny = dx * inv, dy * inv
+        dv = vel[ib] - vel[ia]
+        vrel = dv[:, 0] * nx + dv[:, 1] * ny
+        f = -self.k * (length - self.rest) - self.c * vrel
+        return np.stack((nx * f, ny * f), axis=1), live
+
+    def apply(self, bodies, store=None):
+        self._flush()
+        if len(self.ia) == 0:
+            return
+
+        if store is not None and store.fresh:
+            pos, vel, force = store.pos, store.vel, store.force
+            involved = None
+            ia, ib = self.ia, self.ib
+            group = store.bodies
+            inv_mass = store.inv_mass
+            awake = np.fromiter((b.awake for b in group), dtype=bool, count=len(group))
+        else:
+            # Gather just the bodies the springs touch
+            involved, local = np.unique(np.concatenate((self.ia, self.ib)), return_inverse=True)
+            ia, ib = local[:len(self.ia)], local[len(self.ia):]
+            group = [bodies[k] for k in involved.tolist()]
+            pos = np.array([(b.pos.x, b.pos.y) for b in group])
+            vel = np.array([(b.vel.x, b.vel.y) for b in group])
+            force = np.array([(b.force.x, b.force.y) for b in group])
+            inv_mass = np.array([b.inv_mass for b in group])
+            awake = np.fromiter((b.awake for b in group), dtype=bool, count=len(group))
+
+        fb, live = self.forces(pos, vel, ia, ib)
+
+        # Same rules as World's Spring loop: a spring runs while either end
+        # is active, static ends take no force, sleeping ends wake up
+        dynamic = inv_mass != 0
+        active = dynamic & awake
+        live &= active[ia] | active[ib]
+        index = np.stack((ia, ib), axis=1).ravel()
+        values = np.stack((-fb, fb), axis=1).reshape(-1, 2)
+        keep = (np.repeat(live, 2) & dynamic[index]).nonzero()[0]
+        index, values = index[keep], values[keep]
+        np.add.at(force, index, values)
+
+        pushed = np.unique(index[(values[:, 0] != 0) | (values[:, 1] != 0)])
+        for k in pushed[~awake[pushed]].tolist():
+            group[k].wake()
+
+        if involved is not None:
+            for b, (fx, fy) in zip(group, force.tolist()):
+                b.force.x, b.force.y = fx, fy
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body import Body
+from vector import Vec2
+from world import World
+
+pytest.importorskip("numpy")
+
+
+def pile(world):
+    # Balls packed between two static walls, so the outer ones also have
+    # scalar contacts
+    world.bodies.append(Body(pos=Vec2(-1.7, -1.0), mass=0, width=0.5, height=4.0))
+    world.bodies.append(Body(pos=Vec2(1.7, -1.0), mass=0, width=0.5, height=4.0))
+    for row in range(4):
+        for col in range(6):
+            x = -1.25 + col * 0.46 + (0.23 if row % 2 else 0)
+            world.bodies.append(Body(pos=Vec2(x, -2.75 + row * 0.4), radius=0.22, mass=1))
+
+
+def state(world):
+    return [(b.pos.x, b.pos.y, b.vel.x, b.vel.y, b.ang_vel) for b in world.bodies]
+
+
+# -------------------------------
+# Balls shared with the scalar solver
+# -------------------------------
+def test_batch_pile_settles_between_walls():
+    world = World()
+    world.circle_solver = "batch"
+    pile(world)
+    for _ in range(120):
+        world.step(1 / 60)
+
+    for b in world.bodies[2:]:
+        assert -1.45 - 0.05 < b.pos.x - b.radius and b.pos.x + b.radius < 1.45 + 0.05
+        assert b.pos.y - b.radius > world.ground_y - 0.05
+        assert b.vel.length() < 0.5
+
+
+def test_batch_matches_with_and_without_store():
+    worlds = [World(), World(array_store=True)]
+    for world in worlds:
+        world.circle_solver = "batch"
+        pile(world)
+        for _ in range(30):
+            world.step(1 / 60)
+
+    assert state(worlds[0]) == state(worlds[1])
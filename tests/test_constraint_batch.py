@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body import Body
+from constraints import RopeConstraint
+from vector import Vec2
+from world import World
+
+pytest.importorskip("numpy")
+
+
+def hang_chain(world, links=4):
+    # Static anchor that is not in world.bodies, as main.py builds ropes
+    anchor = Body(pos=Vec2(0.0, 3.0), mass=0, width=0.3, height=0.3)
+    prev = anchor
+    for i in range(links):
+        b = Body(pos=Vec2(0.5 * (i + 1), 3.0 - 0.2 * i), radius=0.15, mass=1)
+        world.bodies.append(b)
+        world.constraints.append(RopeConstraint(prev, b, 0.5))
+        prev = b
+    return anchor
+
+
+# -------------------------------
+# Anchors outside world.bodies
+# -------------------------------
+def test_store_batch_solves_anchor_links():
+    world = World(array_store=True)
+    world.constraint_solver = "batch"
+    anchor = hang_chain(world)
+    for _ in range(30):
+        world.step(1 / 60)
+
+    assert world.constraints[0] in world._constraint_batch.constraints
+    first = world.bodies[0]
+    assert (first.pos - anchor.pos).length() <= 0.5 + 1e-3
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry import polygon_properties
+
+
+# -------------------------------
+# Polygon validation
+# -------------------------------
+@pytest.mark.parametrize("points", [
+    [(0, 0), (1, 0), (1, 0), (0, 1)],           # repeated vertex
+    [(0, 0), (1, 0), (0, 1), (0, 0)],           # closing vertex repeated
+    [(0, 0), (1, 0), (2, 0), (1, 1)],           # collinear vertex
+    [(0, 0), (1, 0), (2, 0)],                   # zero area
+    [(0, 0), (2, 0), (1, 0.5), (1, 2)],         # concave
+])
+def test_degenerate_polygons_raise_value_error(points):
+    with pytest.raises(ValueError):
+        polygon_properties(points)
+
+
+def test_convex_polygon_either_winding():
+    square = [(0, 0), (2, 0), (2, 2), (0, 2)]
+    local, area, centroid, _ = polygon_properties(square)
+    assert area == 4.0
+    assert centroid == (1.0, 1.0)
+    assert polygon_properties(square[::-1])[0] == local
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body import Body
+from constraints import DistanceJoint
+from vector import Vec2
+from world import World
+
+
+def make_world(n=4):
+    world = World()
+    world.deterministic = True
+    world.gravity = Vec2(0, 0)
+    world.bodies += [Body(pos=Vec2(2.0 * i, 0.0), radius=0.4, mass=1.0) for i in range(n)]
+    return world
+
+
+def link_indices(world, links):
+    index = {b: i for i, b in enumerate(world.bodies)}
+    return [(index[c.a], index[c.b]) for c in links]
+
+
+# -------------------------------
+# Canonical order in deterministic mode
+# -------------------------------
+def test_network_added_after_first_step_is_sorted():
+    np = pytest.importorskip("numpy")
+    from spring_network import SpringNetwork
+
+    world = make_world()
+    world.step(1 / 60)
+    net = SpringNetwork()
+    net.add(2, 3, 10.0, 0.1, 2.0)
+    net.add(0, 1, 10.0, 0.1, 2.0)
+    world.spring_networks.append(net)
+    world.step(1 / 60)
+    assert net.ia.tolist() == [0, 2]
+
+    net.add(1, 2, 10.0, 0.1, 2.0)
+    world.step(1 / 60)
+    assert np.array_equal(net.ia, [0, 1, 2])
+
+
+def test_same_length_changes_are_resorted():
+    world = make_world()
+    b = world.bodies
+    world.constraints += [DistanceJoint(b[0], b[1], 2.0), DistanceJoint(b[1], b[2], 2.0)]
+    world.step(1 / 60)
+
+    # Reorder: pop + append keeps the list and its length
+    world.constraints.append(world.constraints.pop(0))
+    world.step(1 / 60)
+    assert link_indices(world, world.constraints) == [(0, 1), (1, 2)]
+
+    # Replace in place
+    world.constraints[0] = DistanceJoint(b[2], b[3], 2.0)
+    world.step(1 / 60)
+    assert link_indices(world, world.constraints) == [(1, 2), (2, 3)]
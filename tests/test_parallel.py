@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body import Body
+from constraints import RopeConstraint
+from vector import Vec2
+from world import World
+
+
+def anchored_ropes(world):
+    # Ropes hung from static anchors that are not in world.bodies
+    for x in (-3.0, 3.0):
+        prev = Body(pos=Vec2(x, 3.0), mass=0, width=0.3, height=0.3)
+        for i in range(4):
+            b = Body(pos=Vec2(x + 0.5 * (i + 1), 3.0 - 0.2 * i), radius=0.15, mass=1)
+            world.bodies.append(b)
+            world.constraints.append(RopeConstraint(prev, b, 0.5))
+            prev = b
+
+
+def run(mode=None, frames=20):
+    world = World()
+    anchored_ropes(world)
+    if mode is not None:
+        world.enable_parallel(mode, workers=2, min_bodies=0, measure=False)
+    try:
+        for _ in range(frames):
+            world.step(1 / 60)
+    finally:
+        if world.parallel is not None:
+            world.parallel.shutdown()
+    return world
+
+
+def state(world):
+    return [(b.pos.x, b.pos.y, b.angle, b.vel.x, b.vel.y, b.ang_vel) for b in world.bodies]
+
+
+# -------------------------------
+# Process mode
+# -------------------------------
+def test_process_mode_matches_serial_with_outside_anchors():
+    world = run("process")
+    assert world.parallel.frames["parallel"] == 20
+    assert state(world) == state(run())
@@ -0,0 +1,61 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from body import Body
+from constraints import RopeConstraint
+from vector import Vec2
+from world import World
+
+
+def make_world():
+    world = World()
+    anchor = Body(pos=Vec2(0.0, 2.0), mass=0, radius=0.1)
+    world.bodies.append(anchor)
+    prev = anchor
+    for i in range(5):
+        b = Body(pos=Vec2(0.4 * (i + 1), 2.0), radius=0.15, mass=1)
+        world.bodies.append(b)
+        world.constraints.append(RopeConstraint(prev, b, 0.4))
+        prev = b
+    world.bodies.append(Body(pos=Vec2(1.0, -2.5), mass=2, width=1, height=0.5))
+    for _ in range(30):
+        world.step(1 / 60)
+    return world
+
+
+def state(world):
+    return [(b.pos.x, b.pos.y, b.angle, b.vel.x, b.vel.y, b.ang_vel) for b in world.bodies]
+
+
+def run(world, frames=30):
+    for _ in range(frames):
+        world.step(1 / 60)
+    return state(world)
+
+
+# -------------------------------
+# Lazy forks
+# -------------------------------
+def test_fork_builds_bodies_on_first_use():
+    world = make_world()
+    snap = world.snapshot()
+    fork = snap.fork()
+    assert "bodies" not in vars(fork)
+
+    expected = run(world)
+    assert run(fork) == expected
+    assert fork.constraints[0].a is fork.bodies[0]
+
+
+def test_restore_over_unbuilt_fork():
+    world = make_world()
+    first = world.snapshot()
+    run(world)
+    second = world.snapshot()
+    expected = run(world)
+
+    fork = first.fork()
+    fork.restore(second.to_bytes())
+    assert run(fork) == expected
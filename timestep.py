@@ -0,0 +1,49 @@
+# -------------------------------
+# Fixed-timestep driver
+# -------------------------------
+class FixedTimestep:
+    # Decouples physics from the render loop: advance() is fed real elapsed
+    # time and runs as many whole world.step(dt) calls as it covers. The
+    # leftover fraction of a step becomes alpha, and pose() blends each
+    # body between its last two physics states so rendering stays smooth
+    # even when physics runs slower than the display.
+    def __init__(self, world, dt=1 / 60, max_steps=5):
+        self.world = world
+        self.dt = dt
+        # Spiral-of-death guard: at most this many steps per advance();
+        # time beyond that is dropped instead of piling up
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.steps = 0
+        self.dropped_time = 0.0
+        self.previous = {}  # body -> (x, y, angle) before the latest step
+
+    def advance(self, elapsed):
+        # Returns the number of physics steps taken
+        self.accumulator += elapsed
+        steps = 0
+        while self.accumulator >= self.dt and steps < self.max_steps:
+            self.previous = {b: (b.pos.x, b.pos.y, b.angle) for b in self.world.bodies}
+            self.world.step(self.dt)
+            self.accumulator -= self.dt
+            steps += 1
+
+        if self.accumulator >= self.dt:
+            behind = self.accumulator - self.accumulator % self.dt
+            self.dropped_time += behind
+            self.accumulator -= behind
+
+        self.steps += steps
+        self.alpha = self.accumulator / self.dt
+        return steps
+
+    def pose(self, body):
+        # (x, y, angle) between the previous and current state, at alpha
+        x, y, angle = body.pos.x, body.pos.y, body.angle
+        prev = self.previous.get(body)
+        if prev is None:
+            return x, y, angle
+        a = self.alpha
+        px, py, pangle = prev
+        return px + (x - px) * a, py + (y - py) * a, pangle + (angle - pangle) * a
@@ -33,3 +33,41 @@ class Vec2:
 
     def dot(self, other):
         return self.x * other.x + self.y * other.y
+
+    def cross(self, other):
+        # z of the 3D cross product; equals self.perp().dot(other)
+        return self.x * other.y - self.y * other.x
+
+    perp_dot = cross
+
+    # -------------------------------
+    # In-place operations
+    # -------------------------------
+    # These mutate self and allocate nothing, so every holder of this Vec2
+    # sees the change. Body owns its pos/vel/force; don't use them on a
+    # vector that may be shared (cached vertices/axes, manifold normals).
+    def __iadd__(self, other):
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def __isub__(self, other):
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def __imul__(self, scalar):
+        self.x *= scalar
+        self.y *= scalar
+        return self
+
+    def add_scaled(self, v, s):
+        # self += v * s without the temporary
+        self.x += v.x * s
+        self.y += v.y * s
+        return self
+
+    def set(self, x, y):
+        self.x = x
+        self.y = y
+        return self
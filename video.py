@@ -0,0 +1,112 @@
+import argparse
+import shutil
+import subprocess
+
+
+# -------------------------------
+# Frame writers
+# -------------------------------
+class VideoWriter:
+    # Streams packed RGB24 frames (Renderer.frame_bytes()) to a video file.
+    # A .raw/.rgb path gets the frames as-is, with no encoder involved;
+    # anything else is piped to ffmpeg's stdin and encoded by it. To play a
+    # raw file: ffplay -f rawvideo -pixel_format rgb24 -video_size WxH out.raw
+    RAW_EXTENSIONS = (".raw", ".rgb")
+
+    def __init__(self, path, size, fps=60, ffmpeg="ffmpeg",
+                 codec_args=("-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p")):
+        self.path = path
+        self.size = size
+        self.fps = fps
+        self.frames = 0
+        self._frame_len = size[0] * size[1] * 3
+        self._proc = None
+
+        if path.lower().endswith(self.RAW_EXTENSIONS):
+            self._out = open(path, "wb")
+            return
+
+        exe = shutil.which(ffmpeg)
+        if exe is None:
+            raise RuntimeError(f"{ffmpeg} not found; install it or write to a .raw path")
+        w, h = size
+        self._proc = subprocess.Popen(
+            [exe, "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+             *codec_args, path],
+            stdin=subprocess.PIPE)
+        self._out = self._proc.stdin
+
+    def write(self, frame):
+        if len(frame) != self._frame_len:
+            raise ValueError(f"frame is {len(frame)} bytes, expected {self._frame_len}")
+        self._out.write(frame)
+        self.frames += 1
+
+    def close(self):
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        if self._proc is not None and self._proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self._proc.returncode}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------------
+# Offscreen rendering
+# -------------------------------
+def render_video(world, path, frames, dt=1 / 60, steps_per_frame=1, fps=None):
+    # Steps the world and renders every frame offscreen, as fast as the
+    # physics and drawing allow rather than in real time. fps defaults to
+    # the simulated rate, 1 / (dt * steps_per_frame). Returns the writer.
+    from render import Renderer
+    renderer = Renderer(headless=True)
+    if fps is None:
+        fps = round(1 / (dt * steps_per_frame))
+    with VideoWriter(path, renderer.size, fps) as out:
+        for _ in range(frames):
+            for _ in range(steps_per_frame):
+                world.step(dt)
+            renderer.draw_world(world)
+            renderer.present()
+            out.write(renderer.frame_bytes())
+    return out
+
+
+def main():
+    # Render one of the benchmark scenes, e.g.
+    #   python video.py rope_chain rope.mp4 --seconds 10
+    import os
+    import sys
+    from time import perf_counter
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    from scenes import SCENES
+    from world import World
+
+    parser = argparse.ArgumentParser(description="Offscreen video export of a benchmark scene")
+    parser.add_argument("scene", choices=sorted(SCENES))
+    parser.add_argument("out", help="output path (.mp4 etc. via ffmpeg, or .raw)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--fps", type=int, default=60)
+    args = parser.parse_args()
+
+    build, _, kwargs, attrs = SCENES[args.scene]
+    world = World(**kwargs)
+    for key, value in attrs.items():
+        setattr(world, key, value)
+    build(world)
+
+    start = perf_counter()
+    out = render_video(world, args.out, int(args.seconds * args.fps), dt=1 / args.fps)
+    elapsed = perf_counter() - start
+    print(f"{out.frames} frames ({args.seconds:g} s simulated) in {elapsed:.2f} s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
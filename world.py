@@ -1,75 +1,531 @@
 import math
 
 from vector import Vec2
-from collision import (
-    resolve_ground_contact,
-    resolve_circle_circle,
-    resolve_box_box,
-    resolve_box_ground_contact
-)
+from broadphase import SweepAndPrune
+from manifold import Ground, ManifoldCache
+from island import build_islands
+from ccd import lerp_pose, time_of_impact
+from body import CIRCLE
+from collision import GROUND_HANDLERS, PAIR_HANDLERS
+
+# Angular velocity clamp for circles, to prevent explosion
+MAX_ANG_VEL = 50
 
 
 class World:
-    def __init__(self):
+    def __init__(self, array_store=False):
         self.bodies = []
         self.constraints = []
         self.springs = []
+        # SpringNetworks (see spring_network): array-backed springs for
+        # soft-body meshes, applied after the Spring list
+        self.spring_networks = []
         self.gravity = Vec2(0, -9.81)
         self.iterations = 10  # Increased for stability
         self.substeps = 8  # Increased for better precision
 
+        # Adaptive mode: substeps follow the fastest body (no body travels
+        # more than substep_travel of the smallest body size per substep),
+        # and velocity iterations stop once the largest contact impulse and
+        # constraint correction fall below the tolerances. iterations and
+        # max_substeps stay the upper bounds.
+        self.adaptive = False
+        self.min_substeps = 2
+        self.max_substeps = 8
+        self.substep_travel = 0.25
+        self.min_iterations = 2
+        self.impulse_tolerance = 1e-4
+        self.position_tolerance = 1e-4
+        # Counts used by the latest step (solver iterations summed over substeps)
+        self.last_substeps = self.substeps
+        self.last_iterations = 0
+        self.ground_y = -3.0
+        # Contacts persist between substeps; their accumulated impulses
+        # warm-start the next solve so stacks converge in fewer iterations
+        self.warm_starting = True
+        self.manifolds = ManifoldCache()
+        self._ground = Ground(self.ground_y)
+        # Candidate pair finder: SweepAndPrune, SpatialHash or BruteForce
+        self.broadphase = SweepAndPrune()
+        # (restitution, mu) per contact type
+        self.materials = {
+            "circle_ground": (0.3, 0.6),
+            "circle_circle": (0.6, 0.5),
+            "box_ground": (0.2, 0.8),
+            "box_box": (0.3, 0.5),
+            "circle_box": (0.4, 0.5),
+        }
+
+        # Optional numpy structure-of-arrays store: gravity, spring networks
+        # and integration run as single vectorized operations on an array
+        # copy of the bodies, gathered and written back once per substep
+        self.store = None
+        if array_store:
+            from body_store import BodyStore
+            self.store = BodyStore()
+
+        # "scalar" resolves circle pairs one at a time; "batch" solves them
+        # in graph-colored NumPy batches (see collision_batch)
+        self.circle_solver = "scalar"
+        self._circle_batch = None
+
+        # "scalar" solves constraints one at a time in list order; "batch"
+        # solves RopeConstraints and DistanceJoints in graph-colored NumPy
+        # batches (see constraint_batch)
+        self.constraint_solver = "scalar"
+        self._constraint_batch = None
+
+        # Sleeping: resting islands are skipped by integration, broadphase
+        # pairing and the solver until a contact or force wakes them
+        self.allow_sleep = False
+        self._sleeping = {}  # body -> bodies of the island it fell asleep with
+
+        # Optional IslandSolver (see enable_parallel)
+        self.parallel = None
+
+        # Optional StepProfiler (see profiler.py); None skips all timing
+        self.profiler = None
+
+        # Optional TrajectoryRecorder (see recorder.py), fed after each step
+        self.recorder = None
+
+        # Deterministic mode (see lockstep.py): canonical pair and link
+        # order, a fixed iteration count, and state_hash updated every step
+        self.deterministic = False
+        self.state_hash = None
+        self._canonical = None  # contents of the lists last put in canonical order, see _canonical_state
+
+    def enable_parallel(self, mode="thread", workers=None, min_bodies=200, measure=True):
+        # Solve independent islands concurrently (see parallel.py). Frames
+        # only take the parallel path while it measures faster than serial.
+        from parallel import IslandSolver
+        if self.parallel is not None:
+            self.parallel.shutdown()
+        self.parallel = IslandSolver(mode, workers, min_bodies, measure)
+
+    # -------------------------------
+    # Snapshots
+    # -------------------------------
+    def snapshot(self):
+        # Checkpoint of the whole simulation state (see snapshot.py): pass
+        # it to restore() to roll back, or call fork() / to_bytes() on it
+        from snapshot import WorldSnapshot
+        return WorldSnapshot(self)
+
+    def restore(self, snapshot):
+        # snapshot: a WorldSnapshot, or the bytes from its to_bytes()
+        from snapshot import WorldSnapshot
+        if isinstance(snapshot, (bytes, bytearray, memoryview)):
+            snapshot = WorldSnapshot.from_bytes(snapshot)
+        snapshot.restore(self)
+
+    def fork(self):
+        # Independent copy of this world, e.g. for a what-if branch
+        return self.snapshot().fork()
+
+    def __getattr__(self, name):
+        # Only reached for missing attributes: a restored snapshot that had
+        # no bodies to reuse builds them (and its links and contacts) here,
+        # on first use
+        pending = self.__dict__.pop("_pending", None)
+        if pending is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        snapshot, cache = pending
+        snapshot.build(self, cache)
+        return getattr(self, name)
+
     def step(self, dt):
-        dt_sub = dt / self.substeps
+        prof = self.profiler
+        if prof is not None:
+            prof.begin_frame()
+
+        deterministic = self.deterministic
+        if deterministic:
+            self._canonical_order()
+
+        if self.allow_sleep:
+            self._wake_touched_islands()
+
+        adaptive = self.adaptive
+        substeps = self._choose_substeps(dt) if adaptive else self.substeps
+        dt_sub = dt / substeps
+        self.last_substeps = substeps
+        self.last_iterations = 0
+        bullets = [b for b in self.bodies if b.bullet and b.is_active()]
+
+        if self.parallel is not None:
+            self.parallel.run(self, dt, substeps, bullets)
+        else:
+            for _ in range(substeps):
+                self._substep(dt_sub, bullets)
 
-        for _ in range(self.substeps):
-            #  APPLY FORCES
+        if prof is not None:
+            t = prof.end_substeps()
+        if self.allow_sleep:
+            self._update_sleep(dt)
+            if prof is not None:
+                prof.record("sleep", t)
+
+        if prof is not None:
+            prof.count("substeps", substeps)
+            prof.count("iterations", self.last_iterations)
+            prof.end_frame()
+
+        if deterministic:
+            from lockstep import chain_hash
+            self.state_hash = chain_hash(self, self.state_hash)
+
+        if self.recorder is not None:
+            self.recorder.record()
+
+    def _substep(self, dt_sub, bullets, parallel=False):
+        # One substep of step(). parallel=True hands the velocity and
+        # position solve to self.parallel, one job per group of islands
+        prof = self.profiler
+        deterministic = self.deterministic
+        adaptive = self.adaptive
+        if prof is not None:
+            t = prof.begin_substep()
+        if bullets:
+            starts = [(b.pos.x, b.pos.y, b.angle) for b in bullets]
+
+        #  APPLY FORCES
+        # With a store, Spring objects still work on the bodies, so gravity
+        # only goes through the arrays when there are none (the force sums
+        # must add up in the same order as the scalar loop)
+        store = self.store
+        active = None
+        if store is not None and not self.springs:
+            store.load(self.bodies)
+            if self.allow_sleep:
+                active = store.active()
+            store.apply_gravity(self.gravity, active)
+        else:
             for b in self.bodies:
-                if b.inv_mass == 0:
+                if not b.is_active():
                     continue
                 # Apply gravity
                 b.apply_force(self.gravity * b.mass)
+        if prof is not None:
+            t = prof.record("forces", t)
 
-            # Apply springs
-            for s in self.springs:
+        # Apply springs
+        for s in self.springs:
+            if s.a.is_active() or s.b.is_active():
                 s.apply()
+        if store is not None and not store.fresh:
+            store.load(self.bodies)
+        for net in self.spring_networks:
+            net.apply(self.bodies, store)
+        if prof is not None:
+            t = prof.record("springs", t)
 
-            #  INTEGRATE VELOCITY & POSITION
-            # CRITICAL FIX: This now calls the Body's integrate method
-            # so that damping (air resistance/rolling friction) is applied.
+        #  INTEGRATE VELOCITY & POSITION
+        # CRITICAL FIX: This now calls the Body's integrate method
+        # so that damping (air resistance/rolling friction) is applied.
+        if store is not None:
+            # Springs may have woken bodies since the gravity pass
+            if self.allow_sleep:
+                active = store.active()
+            store.integrate(dt_sub, active)
+            store.save(active)
+        else:
             for b in self.bodies:
                 b.integrate(dt_sub)
+        if prof is not None:
+            t = prof.record("integrate", t)
+
+        #  CONTINUOUS COLLISION for bullets
+        if bullets:
+            self._sweep_bullets(bullets, starts)
+            if prof is not None:
+                t = prof.record("ccd", t)
+
+        #  BROADPHASE (once per substep, reused by every iteration)
+        pairs = self.broadphase.pairs(self.bodies)
+        if deterministic:
+            # Independent of the broadphase and of its sort history
+            pairs.sort()
+        if prof is not None:
+            t = prof.record("broadphase", t)
+
+        #  NARROWPHASE: contacts generated once per substep
+        manifolds, batch = self._collide(pairs)
+        if prof is not None:
+            t = prof.record("narrowphase", t)
+            self._count_contacts(prof, pairs, manifolds, batch)
+
+        #  VELOCITY SOLVER (sequential impulses over the contact list)
+        constraints = self.constraints
+        if self.allow_sleep:
+            constraints = [c for c in constraints if c.a.is_active() or c.b.is_active()]
+        joints = None
+        if self.constraint_solver == "batch" and constraints:
+            joints = self._prepare_constraint_batch(constraints, dt_sub)
+            constraints = joints.others
+
+        if batch is not None:
+            batch.share(manifolds, constraints, joints.constraints if joints is not None else ())
+
+        for m in manifolds:
+            m.pre_step(dt_sub)
+        if self.warm_starting:
+            for m in manifolds:
+                m.warm_start()
+            if batch is not None:
+                batch.warm_start()
+        if prof is not None:
+            t = prof.record("pre_step", t)
+
+        islands = None
+        if parallel and batch is None and joints is None:
+            islands = build_islands(self.bodies, manifolds, constraints)
+
+        if islands is not None and len(islands) > 1:
+            # Islands share no dynamic bodies, so solving them apart
+            # gives the same result as the serial loop below
+            self.parallel.solve(islands, self.iterations)
+            self.last_iterations += self.iterations
+            if prof is not None:
+                t = prof.record("parallel_solve", t)
+        else:
+            for it in range(self.iterations):
+                impulse = 0.0
+                for m in manifolds:
+                    r = m.solve()
+                    if r > impulse:
+                        impulse = r
+                if batch is not None:
+                    impulse = max(impulse, batch.solve())
+                if prof is not None:
+                    t = prof.record("contact_solve", t, it)
+
+                # Solve constraints
+                correction = 0.0
+                for c in constraints:
+                    r = c.solve()
+                    if r is not None and r > correction:
+                        correction = r
+                if joints is not None:
+                    correction = max(correction, joints.solve())
+                if prof is not None:
+                    t = prof.record("constraints", t, it)
+
+                self.last_iterations += 1
+                # Deterministic mode always runs every iteration, as
+                # the parallel solver does
+                if (adaptive and not deterministic and it + 1 >= self.min_iterations and
+                        impulse < self.impulse_tolerance and
+                        correction < self.position_tolerance):
+                    break
+            if batch is not None:
+                batch.finish()
+            if joints is not None:
+                joints.finish()
+
+            # Clamp angular velocity to prevent explosion
+            for b in self.bodies:
+                if b.shape == "circle":
+                    b.ang_vel = max(-MAX_ANG_VEL, min(MAX_ANG_VEL, b.ang_vel))
+
+            #  POSITION CORRECTION (single pass)
+            for m in manifolds:
+                m.correct_positions()
+            if batch is not None:
+                batch.correct_positions()
+            if prof is not None:
+                t = prof.record("correction", t)
+
+        #  Remove broken constraints; the list is only replaced when
+        #  something broke
+        kept = [c for c in self.constraints if not hasattr(c, "broken") or not c.broken]
+        if prof is not None:
+            prof.count("broken_constraints", len(self.constraints) - len(kept))
+            t = prof.record("cleanup", t)
+        if len(kept) != len(self.constraints):
+            self.constraints = kept
+
+    def _canonical_order(self):
+        # Sort constraints, springs and spring networks by the indices of
+        # the bodies they join (stable, so ties keep insertion order), so the
+        # solve and the force accumulation don't depend on the order links
+        # were added in. Skipped while none of them changed since the last sort.
+        current = self._canonical_state()
+        previous = self._canonical
+        # Arrays go last and are compared by identity, not by ==
+        if (previous is not None and current[:4] == previous[:4] and
+                all(a is b for a, b in zip(current[4], previous[4]))):
+            return
+        from lockstep import canonical_key
+        key = canonical_key(self.bodies)
+        self.constraints.sort(key=key)
+        self.springs.sort(key=key)
+        for net in self.spring_networks:
+            net.sort()
+        self._canonical = self._canonical_state()
+
+    def _canonical_state(self):
+        # Copies of the lists, holding the objects themselves so a replaced,
+        # reordered or appended body, link or network shows as a difference,
+        # plus each network's length and endpoint array (add() and sort()
+        # replace the array)
+        networks = self.spring_networks
+        return (list(self.bodies), list(self.constraints), list(self.springs),
+                [(net, len(net)) for net in networks], [net.ia for net in networks])
+
+    def _sweep_bullets(self, bullets, starts):
+        # Pull each bullet back to its first time of impact this substep;
+        # it keeps its velocity and the narrowphase resolves the contact
+        for b, start in zip(bullets, starts):
+            end = (b.pos.x, b.pos.y, b.angle)
+            t = time_of_impact(b, start, end, self.bodies, self.ground_y)
+            if t is not None:
+                x, y, angle = lerp_pose(start, end, t)
+                b.pos = Vec2(x, y)
+                b.angle = angle
+
+    def _choose_substeps(self, dt):
+        # Fastest point speed (gravity included) against the smallest body.
+        # Bullets are left out: CCD keeps them from tunnelling.
+        fall = self.gravity.length() * dt
+        speed = 0.0
+        size = None
+        for b in self.bodies:
+            if not b.is_active() or b.bullet:
+                continue
+            extent = 2 * b.radius if b.shape == "circle" else min(b.width, b.height)
+            speed = max(speed, b.vel.length() + fall + abs(b.ang_vel) * extent * 0.5)
+            size = extent if size is None else min(size, extent)
+        if not size:
+            return self.min_substeps
+        needed = math.ceil(speed * dt / (self.substep_travel * size))
+        return max(self.min_substeps, min(self.max_substeps, needed))
+
+    def _count_contacts(self, prof, pairs, manifolds, batch):
+        prof.count("pairs_tested", len(pairs))
+        prof.count("manifolds", len(manifolds))
+        contacts = sum(len(m.contacts) for m in manifolds)
+        if batch is not None and batch.colors:
+            contacts += len(batch.jn)
+        prof.count("contacts", contacts)
+
+    def _collide(self, pairs):
+        ground = self._ground
+        ground.pos.y = self.ground_y
+
+        batch = None
+        if self.circle_solver == "batch":
+            batch = self._prepare_circle_batch(pairs)
+
+        # Fresh manifolds start from zero impulse; ManifoldCache.update
+        # carries matching impulses over when warm starting is on
+        found = {}
+        mat = self.materials
+        for b in self.bodies:
+            if not b.is_active():
+                continue
+            handler = GROUND_HANDLERS.get(b.shape_type)
+            if handler is None:
+                continue
+            build, material = handler
+            m = build(b, ground, *mat[material])
+            if m is not None:
+                found[(ground, b)] = m
+
+        handlers = PAIR_HANDLERS
+        if batch is not None:
+            # Circle pairs are solved by the batch instead
+            handlers = dict(PAIR_HANDLERS)
+            del handlers[(CIRCLE, CIRCLE)]
+
+        bodies = self.bodies
+        for i, j in pairs:
+            a = bodies[i]
+            b = bodies[j]
+            handler = handlers.get((a.shape_type, b.shape_type))
+            if handler is None:
+                continue
+            build, material = handler
+            m = build(a, b, *mat[material])
+            if m is not None:
+                found[(a, b)] = m
+                # Wake-on-contact
+                if not (a.awake and b.awake):
+                    self._wake_island(a)
+                    self._wake_island(b)
+
+        if batch is not None and self._sleeping:
+            for i, j in batch.touching():
+                self._wake_island(self.bodies[i])
+                self._wake_island(self.bodies[j])
+
+        if not self.warm_starting:
+            self.manifolds.clear()
+        return self.manifolds.update(found), batch
 
-            #  COLLISION SOLVER (ITERATIVE)
-            for _ in range(self.iterations):
-                MAX_ANG_VEL = 50
+    def _prepare_circle_batch(self, pairs):
+        if self._circle_batch is None:
+            from collision_batch import CircleBatchSolver
+            self._circle_batch = CircleBatchSolver()
+        self._circle_batch.restitution, self._circle_batch.mu = self.materials["circle_circle"]
 
-                # a) Ground contacts (Ground fixed at y = -3.0)
-                for b in self.bodies:
-                    if b.shape == "circle":
-                        resolve_ground_contact(b, ground_y=-3.0)
-                        # Clamp angular velocity to prevent explosion
-                        b.ang_vel = max(-MAX_ANG_VEL, min(MAX_ANG_VEL, b.ang_vel))
+        circle_pairs = [(i, j) for i, j in pairs
+                        if self.bodies[i].shape_type == CIRCLE and self.bodies[j].shape_type == CIRCLE]
+        self._circle_batch.prepare(self.bodies, circle_pairs, self.warm_starting)
+        return self._circle_batch
 
-                    elif b.shape == "box":
-                        for _ in range(1):
-                            resolve_box_ground_contact(b, ground_y=-3.0, restitution=0.2, mu=0.8)
+    def _prepare_constraint_batch(self, constraints, dt):
+        if self._constraint_batch is None:
+            from constraint_batch import ConstraintBatchSolver
+            self._constraint_batch = ConstraintBatchSolver()
+        self._constraint_batch.prepare(constraints, dt)
+        return self._constraint_batch
 
-                # b) Body-body collisions
-                n = len(self.bodies)
-                for i in range(n):
-                    for j in range(i + 1, n):
-                        a = self.bodies[i]
-                        b = self.bodies[j]
+    # -------------------------------
+    # Sleeping
+    # -------------------------------
+    def _wake_island(self, body):
+        group = self._sleeping.get(body)
+        if group is None:
+            if not body.awake:
+                body.wake()
+            return
+        for b in group:
+            b.wake()
+            self._sleeping.pop(b, None)
 
-                        if a.shape == "circle" and b.shape == "circle":
-                            resolve_circle_circle(a, b)
-                        elif a.shape == "box" and b.shape == "box":
-                            resolve_box_box(a, b)
+    def _wake_touched_islands(self):
+        # A force (or user code) may have woken one body of a sleeping island
+        # since the last step; wake the rest of it too
+        for b in list(self._sleeping):
+            if b.awake:
+                self._wake_island(b)
 
-                # c) Solve constraints
-                for c in self.constraints:
-                    c.solve()
+    def _update_sleep(self, dt):
+        springs = self.springs
+        if self.spring_networks:
+            springs = springs + [s for net in self.spring_networks for s in net.springs(self.bodies)]
+        islands = build_islands(self.bodies, self.manifolds.manifolds.values(),
+                                self.constraints, springs)
+        for island in islands:
+            bodies = island.bodies
+            if not island.is_awake():
+                continue
+            if not all(b.awake for b in bodies):
+                # A sleeping body got linked to an awake one
+                for b in bodies:
+                    self._wake_island(b)
 
-            #  Remove broken constraints
+            resting = True
+            for b in bodies:
+                if (b.vel.length() > b.sleep_linear_threshold or
+                        abs(b.ang_vel) > b.sleep_angular_threshold):
+                    b.sleep_time = 0.0
+                    resting = False
+                else:
+                    b.sleep_time += dt
 
-            self.constraints = [c for c in self.constraints if not hasattr(c, "broken") or not c.broken]
+            if resting and all(b.sleep_time >= b.time_to_sleep for b in bodies):
+                for b in bodies:
+                    b.sleep()
+                    self._sleeping[b] = bodies